@@ -1,38 +1,148 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from datetime import datetime
+import os
+
 import warnings
+from collections import Counter
 warnings.filterwarnings('ignore')
 
-print("Loading datasets...")
-# Load all 3 datasets
-enrolment = pd.read_csv('api_data_aadhar_enrolment/api_data_aadhar_enrolment/api_data_aadhar_enrolment_0_500000.csv')
-demographic = pd.read_csv('api_data_aadhar_demographic/api_data_aadhar_demographic/api_data_aadhar_demographic_0_500000.csv')
-biometric = pd.read_csv('api_data_aadhar_biometric/api_data_aadhar_biometric/api_data_aadhar_biometric_0_500000.csv')
+from canonical_names import NAMES_VERSION, NameResolver
+from data_store import (dataset_path, has_dataset, load_frame, partition_filters, partitions_of,
+                        read_dataset, replace_partitions, save_frame)
+from hierarchy import HIERARCHY_PATH, Hierarchy, has_current_hierarchy, has_pairs, load_pairs, update_pairs
+from ingest import (INGEST_WORKERS, MERGE_MODE, apply_delta, canonical_totals, discover_shards, merge_sources,
+                    read_sources)
+from manifest import (FULL_REBUILD, drop_shard_totals, empty_manifest, load_manifest, load_shard_totals,
+                      mark_pending, plan_ingest, reset_shard_totals, save_manifest, save_shard_totals)
+from schema import SCHEMA_VERSION
+from validation import QUARANTINE_ROOT, RULES, drop_quarantine, reset_quarantine
+
+
+def save_hierarchy(pairs):
+    hierarchy = Hierarchy.from_pairs(pairs)
+    hierarchy.save()
+    print(f"✅ Hierarchy index saved to '{HIERARCHY_PATH}': {len(hierarchy.pincodes):,} pincodes, "
+          f"{len(hierarchy.district_names):,} districts, {len(hierarchy.state_names)} states")
+    if hierarchy.ambiguous.any():
+        print(f"⚠️ {int(hierarchy.ambiguous.sum()):,} pincode(s) appear under more than one district; "
+              f"each is assigned to the district with the most rows")
+
+
+# Worker processes re-import this module on spawn-based platforms, so the
+# pipeline only runs when executed as a script.
+if __name__ == '__main__':
+    print("Discovering shards...")
+    shards = {name: discover_shards(name) for name in ['enrolment', 'demographic', 'biometric']}
+    for name, paths in shards.items():
+        print(f"  {name}: {len(paths)} shard(s)")
+
+    # Only shards that are new or changed since the last run get parsed
+    manifest = load_manifest()
+    full_rebuild = (FULL_REBUILD or not has_dataset('merged') or not manifest['shards']
+                    or manifest.get('names_version') != NAMES_VERSION
+                    or manifest.get('schema_version') != SCHEMA_VERSION)
+    if full_rebuild:
+        manifest = empty_manifest()
+        manifest['names_version'] = NAMES_VERSION
+        manifest['schema_version'] = SCHEMA_VERSION
+        reset_shard_totals()
+        reset_quarantine()
+    to_read, fingerprints, retired = plan_ingest(shards, manifest)
+    new_count = sum(len(paths) for paths in to_read.values())
+    print(f"\nIngest plan ({'full rebuild' if full_rebuild else 'incremental'}): "
+          f"{new_count} new/changed shard(s), {len(retired)} retired, "
+          f"{len(fingerprints) - new_count} unchanged")
+
+    if not full_rebuild and new_count == 0 and not retired:
+        print("\n✅ Merged data already up to date")
+        if not has_current_hierarchy():
+            save_hierarchy(load_pairs() if has_pairs()
+                           else update_pairs(load_frame('merged', columns=['state', 'district', 'pincode'])))
+        raise SystemExit(0)
+
+    def keep_shard_totals(source, path, totals, rejected):
+        entry = fingerprints[os.path.normpath(path)]
+        save_shard_totals(source, entry['sha256'], totals)
+        entry['rejected'] = rejected
+
+    workers = INGEST_WORKERS or os.cpu_count()
+    print(f"\nLoading datasets ({workers} worker process{'es' if workers > 1 else ''})...")
+    # Stream every shard in bounded chunks, folding each chunk into per-key totals
+    # State and district names are canonicalised once here; later steps never see raw spellings
+    resolver = NameResolver()
+    sources = read_sources(to_read, workers=workers, on_shard=keep_shard_totals, resolver=resolver)
+    resolver.save()
+    if resolver.dropped:
+        print(f"Dropped {sum(resolver.dropped.values()):,} rows with unresolvable states: "
+              f"{dict(resolver.dropped)}")
+    enrolment, demographic, biometric = sources['enrolment'], sources['demographic'], sources['biometric']
+
+    print(f"Enrolment: {enrolment.shape}")
+    print(f"Demographic: {demographic.shape}")
+    print(f"Biometric: {biometric.shape}")
 
-print(f"Enrolment: {enrolment.shape}")
-print(f"Demographic: {demographic.shape}")
-print(f"Biometric: {biometric.shape}")
+    if full_rebuild:
+        # Join all three sources on (date, state, district, pincode) in one pass
+        print(f"\nMerging datasets (mode: {MERGE_MODE})...")
+        final_data = merge_sources({
+            'demographic': demographic,
+            'biometric': biometric,
+            'enrolment': enrolment,
+        })
+    else:
+        # Add the new totals to the partitions they touch, minus what retired shards contributed
+        print("\nApplying incremental update...")
+        # Shard totals are kept under their raw names; the resolver cache maps them as before
+        retired_totals = [canonical_totals(load_shard_totals(entry), entry['source'], resolver) for entry in retired]
+        affected = set()
+        for frame in list(sources.values()) + retired_totals:
+            affected |= partitions_of(frame)
+        existing = read_dataset('merged', filters=partition_filters(affected))
+        final_data = apply_delta(existing, list(sources.values()), retired_totals)
+        print(f"  {len(affected)} state/month partition(s) affected, {len(existing):,} existing rows re-merged")
+    del sources, enrolment, demographic, biometric
 
-# Merge demographic and biometric first
-print("\nMerging demographic and biometric data...")
-merged = pd.merge(demographic, biometric, on=['date', 'state', 'district', 'pincode'], how='outer')
+    print(f"\nFinal merged dataset shape: {final_data.shape}")
+    print(f"\nColumns: {list(final_data.columns)}")
+    print(f"\nFirst few rows:")
+    print(final_data.head())
 
-# Then merge with enrolment
-print("Merging with enrolment data...")
-final_data = pd.merge(merged, enrolment, on=['date', 'state', 'district', 'pincode'], how='outer')
+    # Check for missing values
+    print("\nMissing values:")
+    print(final_data.isnull().sum())
 
-print(f"\nFinal merged dataset shape: {final_data.shape}")
-print(f"\nColumns: {list(final_data.columns)}")
-print(f"\nFirst few rows:")
-print(final_data.head())
+    # Save merged data and tell step3 which partitions need their indices recomputed
+    if full_rebuild:
+        save_frame(final_data, 'merged')
+    else:
+        replace_partitions(final_data, 'merged', affected)
+        mark_pending(manifest, affected)
+    live_checksums = {entry['sha256'] for entry in fingerprints.values()}
+    for entry in retired:
+        if entry['sha256'] not in live_checksums:
+            drop_shard_totals(entry)
+    for key, entry in manifest['shards'].items():
+        if key not in fingerprints:
+            drop_quarantine(entry['source'], key)
+    manifest['shards'] = fingerprints
+    save_manifest(manifest)
+    print(f"\n✅ Merged data saved to '{dataset_path('merged')}' (partitioned by state/month)")
 
-# Check for missing values
-print("\nMissing values:")
-print(final_data.isnull().sum())
+    # Validation counters over every live shard, not just the ones parsed this run
+    rejected = Counter()
+    for entry in fingerprints.values():
+        rejected.update(entry.get('rejected', {}))
+    if rejected['rejected']:
+        print(f"⚠️ {rejected['rejected']:,} row(s) failed validation and were quarantined to '{QUARANTINE_ROOT}':")
+        for rule in RULES:
+            if rejected[rule]:
+                print(f"  {rule}: {rejected[rule]:,}")
+    else:
+        print("✅ All rows passed validation")
 
-# Save merged data
-final_data.to_csv('merged_aadhaar_data.csv', index=False)
-print("\n✅ Merged data saved to 'merged_aadhaar_data.csv'")
+    # Pincode -> district -> state index; an incremental run only counts the refreshed partitions
+    if full_rebuild:
+        pairs = update_pairs(final_data)
+    elif has_pairs():
+        pairs = update_pairs(final_data, existing)
+    else:
+        pairs = update_pairs(load_frame('merged', columns=['state', 'district', 'pincode']))
+    save_hierarchy(pairs)
@@ -3,8 +3,18 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import os
 from datetime import datetime
 
+from data_store import dataset_path
+from frame_cache import cached_frame
+from risk_labels import risk_level_labels
+from rollups import load_rollup, rollup, rollup_name, with_means
+from schema import decode_dates
+from feature_store import load_features
+from scoring import get_scorer
+from windows import rolling_indices
+
 # Page configuration
 st.set_page_config(
     page_title="Digital Divide Predictor",
@@ -332,25 +342,54 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Load data
-@st.cache_data
+# Read-only frames are cached as shared resources, not pickled per rerun, so
+# every session reads the same memory-mapped columns; pages must not modify
+# them in place
+@st.cache_resource
 def load_data():
-    data = pd.read_csv('processed_aadhaar_data.csv')
+    # The state×date rollup from step3 covers every page; it is served from the
+    # memory-mapped frame cache, rebuilt when a source file changes
+    data = cached_frame('dashboard_state_date', [dataset_path(rollup_name('state_date'))],
+                        lambda: load_rollup('state_date'))
     # Try to load enhanced predictions first, fall back to old clusters
-    try:
-        clusters = pd.read_csv('district_predictions_enhanced.csv')
+    if os.path.exists('district_predictions_enhanced.csv'):
+        clusters = cached_frame('dashboard_predictions', ['district_predictions_enhanced.csv'],
+                                lambda: pd.read_csv('district_predictions_enhanced.csv'))
         # Add cluster_label based on risk_level for compatibility
         if 'cluster_label' not in clusters.columns:
-            clusters['cluster_label'] = clusters['risk_level'].map({
-                0: 'Thriving',
-                1: 'Struggling', 
-                2: 'Critical'
-            })
+            clusters['cluster_label'] = risk_level_labels(clusters['risk_level']).astype(object)
         print("✅ Using enhanced ML predictions (100% accuracy model)")
-    except:
-        clusters = pd.read_csv('district_clusters.csv')
+    else:
+        clusters = cached_frame('dashboard_clusters', ['district_clusters.csv'],
+                                lambda: pd.read_csv('district_clusters.csv'))
         print("⚠️ Using basic clustering (fallback)")
     return data, clusters
 
+@st.cache_resource
+def load_district_windows():
+    # 7/30/90-day DLI and IGS for every district, from the district×date rollup
+    district_date = cached_frame('dashboard_district_date', [dataset_path(rollup_name('district_date'))],
+                                 lambda: load_rollup('district_date'))
+    return rolling_indices(district_date, ['state', 'district'])
+
+@st.cache_resource
+def load_scorer():
+    # Saved scaler and ensemble from step5_improved, loaded once per server process
+    try:
+        return get_scorer()
+    except FileNotFoundError:
+        return None
+
+@st.cache_resource
+def score_districts():
+    # Live risk scores for every district of the current feature table, in one batch
+    scorer = load_scorer()
+    if scorer is None:
+        return None
+    districts, meta = load_features()
+    scores = districts[['state', 'district']].join(scorer.score(districts, meta['version']))
+    return scores.astype({'state': str, 'district': str}).set_index(['state', 'district'])
+
 # Main title with enhanced visuals
 st.markdown('''
 <div style="text-align: center; margin-bottom: 2rem;">
@@ -413,13 +452,13 @@ try:
         col1, col2, col3, col4 = st.columns(4)
         
         critical_count = len(clusters[clusters['cluster_label'] == 'Critical'])
-        avg_dli = data['DLI'].mean()
+        avg_dli = data['DLI_sum'].sum() / data['row_count'].sum()
         
         with col1:
             st.markdown(f'''
             <div class="glass-card" style="text-align: center; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white;">
                 <div style="font-size: 3rem; margin-bottom: 10px;">📊</div>
-                <div style="font-size: 2.5rem; font-weight: 700; animation: pulse 2s infinite;">{len(data):,}</div>
+                <div style="font-size: 2.5rem; font-weight: 700; animation: pulse 2s infinite;">{int(data['row_count'].sum()):,}</div>
                 <div style="font-size: 1rem; opacity: 0.9; margin-top: 5px;">Total Records</div>
             </div>
             ''', unsafe_allow_html=True)
@@ -521,7 +560,7 @@ try:
                 </div>
                 <div style="display: flex; justify-content: space-between; margin-bottom: 5px;">
                     <span style="font-weight: 600;">Total Records</span>
-                    <span style="font-weight: 700; color: #667eea; font-size: 1.2rem;">{len(data):,}</span>
+                    <span style="font-weight: 700; color: #667eea; font-size: 1.2rem;">{int(data['row_count'].sum()):,}</span>
                 </div>
                 <div style="display: flex; justify-content: space-between; margin-bottom: 5px;">
                     <span style="font-weight: 600;">Days Tracked</span>
@@ -673,9 +712,17 @@ try:
                 st.write(f"**State Rank:** {state_rank} of {total_in_state}")
                 st.write(f"**National Rank:** {national_rank} of {len(clusters)}")
                 
-                # Show ML prediction confidence if available
-                if 'risk_probability' in district_info:
+                # Score the district live with the saved ensemble; fall back to
+                # the probability precomputed in the predictions CSV
+                live_scores = score_districts()
+                key = (str(selected_state), str(selected_district))
+                if live_scores is not None and key in live_scores.index:
+                    risk_prob = live_scores.loc[key, 'risk_probability']
+                elif 'risk_probability' in district_info:
                     risk_prob = district_info['risk_probability']
+                else:
+                    risk_prob = None
+                if risk_prob is not None:
                     st.markdown("---")
                     st.markdown("### 🤖 AI Confidence")
                     st.progress(float(risk_prob))
@@ -793,11 +840,8 @@ try:
         # Time series if date column exists
         if 'date' in data.columns:
             st.subheader("📅 Temporal Trends")
-            daily_stats = data.groupby('date').agg({
-                'total_demo_updates': 'sum',
-                'total_bio_updates': 'sum',
-                'DLI': 'mean'
-            }).reset_index()
+            daily_stats = with_means(rollup(data, ['date']))
+            daily_stats['date'] = decode_dates(daily_stats['date'])
             
             fig = go.Figure()
             fig.add_trace(go.Scatter(x=daily_stats['date'], y=daily_stats['total_demo_updates'],
@@ -810,6 +854,30 @@ try:
                             xaxis_title='Date', yaxis_title='Number of Updates')
             st.plotly_chart(fig, width='stretch')
 
+            st.subheader("📈 Rolling Digital Literacy Index")
+            district_windows = load_district_windows()
+            col1, col2 = st.columns(2)
+            with col1:
+                window_state = st.selectbox("State/UT", sorted(data['state'].unique()), key='window_state')
+            in_state = district_windows[district_windows['state'] == window_state]
+            with col2:
+                window_district = st.selectbox("District", ['All districts'] + sorted(in_state['district'].unique()),
+                                               key='window_district')
+            if window_district == 'All districts':
+                windows = rolling_indices(data[data['state'] == window_state], ['state'])
+            else:
+                windows = in_state[in_state['district'] == window_district].copy()
+            windows['date'] = decode_dates(windows['date'])
+
+            fig = go.Figure()
+            for days, color in [(7, '#ff7f0e'), (30, '#667eea'), (90, '#2ca02c')]:
+                fig.add_trace(go.Scatter(x=windows['date'], y=windows[f'DLI_{days}d'],
+                                        mode='lines', name=f'{days}-day DLI',
+                                        line=dict(color=color)))
+            fig.update_layout(title=f'Rolling DLI: {window_district}, {window_state}', height=400,
+                            xaxis_title='Date', yaxis_title='Digital Literacy Index')
+            st.plotly_chart(fig, width='stretch')
+
     # PAGE 4: ML MODEL PERFORMANCE
     elif page == "🤖 ML Model Performance":
         st.markdown('<h2 style="text-align: center; font-size: 2.5rem; font-weight: 700; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); -webkit-background-clip: text; -webkit-text-fill-color: transparent; margin-bottom: 2rem;">🤖 Machine Learning Model Performance</h2>', unsafe_allow_html=True)
@@ -1047,11 +1115,12 @@ try:
         st.subheader("🌏 Regional Performance Matrix")
         
         # Create performance categories
-        clusters['Performance'] = pd.cut(clusters['DLI'], 
-                                        bins=[0, 0.1, 0.2, 0.3, 1.0],
-                                        labels=['Very Low', 'Low', 'Medium', 'High'])
+        performance = pd.cut(clusters['DLI'],
+                             bins=[0, 0.1, 0.2, 0.3, 1.0],
+                             labels=['Very Low', 'Low', 'Medium', 'High'])
         
-        performance_matrix = clusters.groupby(['state', 'Performance']).size().reset_index(name='Count')
+        performance_matrix = (clusters.assign(Performance=performance)
+                              .groupby(['state', 'Performance']).size().reset_index(name='Count'))
         
         top_states = clusters.groupby('state')['DLI'].mean().nlargest(10).index
         performance_matrix_top = performance_matrix[performance_matrix['state'].isin(top_states)]
@@ -1214,7 +1283,7 @@ try:
         # Expected impact
         st.subheader("💰 Expected Impact & ROI")
         
-        total_affected = int(data['total_demo_updates'].sum() - data['total_bio_updates'].sum())
+        total_affected = int(data['total_demo_updates'].sum()) - int(data['total_bio_updates'].sum())
         
         st.success(f"""
         ### If All Recommendations Are Implemented:
@@ -1243,9 +1312,9 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 EXECUTIVE SUMMARY
 ================
-Total Records Analyzed: {len(data):,}
+Total Records Analyzed: {int(data['row_count'].sum()):,}
 Districts Covered: {clusters['district'].nunique()}
-Average Digital Literacy Index: {data['DLI'].mean():.3f}
+Average Digital Literacy Index: {data['DLI_sum'].sum() / data['row_count'].sum():.3f}
 Critical Districts: {len(clusters[clusters['cluster_label'] == 'Critical'])}
 
 IMMEDIATE ACTIONS (0-3 MONTHS)
@@ -1286,4 +1355,4 @@ EXPECTED IMPACT
 
 except FileNotFoundError:
     st.error("⚠️ Data files not found! Please run step3-step6 Python scripts first to generate the required CSV files.")
-    st.info("Required files: processed_aadhaar_data.csv, district_clusters.csv")
+    st.info("Required files: aadhaar_store/processed_state_date/ (written by step3), district_clusters.csv")
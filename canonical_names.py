@@ -0,0 +1,188 @@
+import difflib
+import json
+import os
+import re
+import unicodedata
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from data_store import STORE_ROOT
+
+# Bump when the rules below change so the next ingest rebuilds from scratch
+NAMES_VERSION = 1
+
+CACHE_PATH = os.path.join(STORE_ROOT, 'name_resolution_cache.json')
+
+# Current states and union territories
+CANONICAL_STATES = [
+    'Andaman and Nicobar Islands', 'Andhra Pradesh', 'Arunachal Pradesh', 'Assam', 'Bihar',
+    'Chandigarh', 'Chhattisgarh', 'Dadra and Nagar Haveli and Daman and Diu', 'Delhi', 'Goa',
+    'Gujarat', 'Haryana', 'Himachal Pradesh', 'Jammu and Kashmir', 'Jharkhand', 'Karnataka',
+    'Kerala', 'Ladakh', 'Lakshadweep', 'Madhya Pradesh', 'Maharashtra', 'Manipur', 'Meghalaya',
+    'Mizoram', 'Nagaland', 'Odisha', 'Puducherry', 'Punjab', 'Rajasthan', 'Sikkim',
+    'Tamil Nadu', 'Telangana', 'Tripura', 'Uttar Pradesh', 'Uttarakhand', 'West Bengal',
+]
+
+# Former names and merged territories, keyed by normalised name
+STATE_ALIASES = {
+    'orissa': 'Odisha',
+    'uttaranchal': 'Uttarakhand',
+    'pondicherry': 'Puducherry',
+    'dadraandnagarhaveli': 'Dadra and Nagar Haveli and Daman and Diu',
+    'damananddiu': 'Dadra and Nagar Haveli and Daman and Diu',
+    'nctofdelhi': 'Delhi',
+}
+
+# Values seen in the state column that are not states at all
+INVALID_STATES = {'100000', 'puttenahalli'}
+
+STATE_CUTOFF = 0.85
+DISTRICT_CUTOFF = 0.9
+
+# Words that tell neighbouring units apart (West/East Godavari, Bangalore
+# Urban/Rural); a fuzzy match is only accepted when these agree.
+QUALIFIERS = {'north', 'south', 'east', 'west', 'upper', 'lower', 'central', 'middle',
+              'urban', 'rural', 'new', 'old', 'greater', 'city'}
+
+
+def name_key(name):
+    """Spelling-insensitive key: ASCII, lower case, '&' as 'and', letters and digits only."""
+    name = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]', '', name.casefold().replace('&', 'and'))
+
+
+def qualifiers(name):
+    name = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode().casefold()
+    words = re.findall(r'[a-z]+|\d+', name)
+    return {word for word in words if word in QUALIFIERS or word.isdigit()}
+
+
+def closest_name(raw, candidates, cutoff):
+    """Best fuzzy match for `raw` among {key: canonical} candidates, or None."""
+    wanted = qualifiers(raw)
+    for key in difflib.get_close_matches(name_key(raw), list(candidates), n=5, cutoff=cutoff):
+        if qualifiers(candidates[key]) == wanted:
+            return candidates[key]
+    return None
+
+
+def display_name(name):
+    """Tidy a raw spelling for display: drop footnote stars, fix spacing and shouting."""
+    name = re.sub(r'\s+', ' ', str(name).replace('*', '')).strip()
+    if name.isupper() or name.islower():
+        name = name.title()
+    return name
+
+
+_STATE_KEYS = {name_key(state): state for state in CANONICAL_STATES}
+_STATE_KEYS.update(STATE_ALIASES)
+
+
+class NameResolver:
+    """Maps raw state/district spellings to canonical names.
+
+    Every distinct raw value is resolved once: exact key match first, then
+    a fuzzy match for new misspellings. Decisions are kept in a JSON cache
+    so they stay stable between runs and can be reviewed or corrected by
+    hand.
+    """
+
+    def __init__(self, cache_path=CACHE_PATH):
+        self.cache_path = cache_path
+        self.states = {}
+        self.districts = {}
+        if os.path.exists(cache_path):
+            with open(cache_path, encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('version') == NAMES_VERSION:
+                self.states = cached['states']
+                self.districts = cached['districts']
+        # Canonical district names per state, by key
+        self._district_keys = {}
+        for entry, canonical in self.districts.items():
+            if canonical is not None:
+                state = entry.split('|', 1)[0]
+                self._district_keys.setdefault(state, {})[name_key(canonical)] = canonical
+        self.dropped = Counter()
+
+    def state(self, raw):
+        if raw in self.states:
+            return self.states[raw]
+        key = name_key(raw)
+        if not key or key.isdigit() or key in INVALID_STATES:
+            canonical = None
+        elif key in _STATE_KEYS:
+            canonical = _STATE_KEYS[key]
+        else:
+            canonical = closest_name(raw, _STATE_KEYS, STATE_CUTOFF)
+        self.states[raw] = canonical
+        return canonical
+
+    def district(self, state, raw):
+        entry = f'{state}|{raw}'
+        if entry in self.districts:
+            return self.districts[entry]
+        key = name_key(raw)
+        known = self._district_keys.setdefault(state, {})
+        if not key or key.isdigit():
+            canonical = None
+        elif key in known:
+            canonical = known[key]
+        else:
+            canonical = closest_name(raw, known, DISTRICT_CUTOFF) or display_name(raw)
+            known.setdefault(key, canonical)
+        self.districts[entry] = canonical
+        return canonical
+
+    def prime(self, pair_rows):
+        """Resolve every raw (state, district) pair of {pair: rows} in a fixed order.
+
+        Most frequent pairs go first, so a district with no known name is
+        named after its most common spelling, whatever order shards were
+        read in.
+        """
+        for (raw_state, raw_district), _ in sorted(pair_rows.items(),
+                                                   key=lambda item: (-item[1], str(item[0][0]), str(item[0][1]))):
+            state = self.state(raw_state)
+            if state is not None:
+                self.district(state, raw_district)
+
+    def canonicalise(self, frame):
+        """Rewrite the state/district columns of `frame` and drop unresolvable rows.
+
+        Work happens once per distinct (state, district) pair; rows are only
+        touched by vectorised take/mask operations.
+        """
+        state_codes, raw_states = pd.factorize(frame['state'])
+        district_codes, raw_districts = pd.factorize(frame['district'])
+        pair_codes, pairs = pd.factorize(state_codes.astype('int64') * len(raw_districts) + district_codes)
+
+        states = np.empty(len(pairs), dtype=object)
+        districts = np.empty(len(pairs), dtype=object)
+        for i, pair in enumerate(pairs):
+            raw_state = raw_states[pair // len(raw_districts)]
+            raw_district = raw_districts[pair % len(raw_districts)]
+            states[i] = self.state(raw_state)
+            districts[i] = None if states[i] is None else self.district(states[i], raw_district)
+
+        valid = pd.notna(states) & pd.notna(districts)
+        keep = valid[pair_codes]
+        if not keep.all():
+            rows_per_pair = np.bincount(pair_codes, minlength=len(pairs))
+            for i in np.flatnonzero(~valid):
+                self.dropped[raw_states[pairs[i] // len(raw_districts)]] += int(rows_per_pair[i])
+            frame = frame.loc[keep].copy()
+            pair_codes = pair_codes[keep]
+        frame['state'] = states[pair_codes]
+        frame['district'] = districts[pair_codes]
+        return frame
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': NAMES_VERSION, 'states': self.states, 'districts': self.districts},
+                      f, indent=2, sort_keys=True, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
@@ -0,0 +1,270 @@
+import os
+import shutil
+from urllib.parse import unquote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from schema import apply_schema, decode_dates
+
+# Columnar, partitioned home for the merged and processed frames.
+# Layout: aadhaar_store/<name>/state=<state>/month=<YYYYMM>/part-0.parquet
+STORE_ROOT = os.environ.get('AADHAAR_STORE', 'aadhaar_store')
+PARTITION_COLS = ['state', 'month']
+
+# Legacy CSV copies are only written when asked for
+EXPORT_CSV = os.environ.get('EXPORT_CSV', '0') == '1'
+CSV_FILES = {
+    'merged': 'merged_aadhaar_data.csv',
+    'processed': 'processed_aadhaar_data.csv',
+}
+
+# In-process runs hand frames from one step to the next through this
+# registry; datasets named as checkpoints are written to disk straight
+# away, the rest by flush_memory() when the run ends. Until then the
+# previous copy stays on disk.
+_memory = None
+_checkpoints = set()
+_unsaved = {}  # name -> 'frame' or 'table', held in memory only
+
+
+def _is_checkpoint(name):
+    # Derived tables (e.g. processed_district) follow their base dataset
+    return any(name == base or name.startswith(base + '_') for base in _checkpoints)
+
+
+def keep_in_memory(checkpoints=()):
+    """Switch save_frame/load_frame to the in-memory registry for this interpreter."""
+    global _memory, _checkpoints
+    _memory = {}
+    _checkpoints = set(checkpoints)
+    _unsaved.clear()
+
+
+def dataset_path(name):
+    return os.path.join(STORE_ROOT, name)
+
+
+def has_dataset(name):
+    return os.path.isdir(dataset_path(name))
+
+
+def add_month(frame):
+    """Derive the YYYYMM partition key from the YYYYMMDD date column."""
+    frame['month'] = (frame['date'] // 100).astype('int32')
+    return frame
+
+
+def _partitioning(dictionary=False):
+    state_type = pa.dictionary(pa.int32(), pa.string()) if dictionary else pa.string()
+    schema = pa.schema([('state', state_type), ('month', pa.int32())])
+    if dictionary:
+        return ds.HivePartitioning.discover(schema=schema)
+    return ds.partitioning(schema, flavor='hive')
+
+
+def write_dataset(frame, name):
+    """Replace a dataset with `frame`, partitioned by state and month."""
+    if 'month' not in frame.columns:
+        frame = add_month(frame)
+    path = dataset_path(name)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    ds.write_dataset(table, path, format='parquet', partitioning=_partitioning(),
+                     basename_template='part-{i}.parquet', max_partitions=100_000,
+                     existing_data_behavior='overwrite_or_ignore')
+
+
+def partitions_of(frame):
+    """Return the set of (state, month) partitions that `frame` touches."""
+    months = frame['month'] if 'month' in frame.columns else frame['date'] // 100
+    keys = pd.DataFrame({'state': frame['state'].astype(str), 'month': months.astype('int32')})
+    return set(keys.drop_duplicates().itertuples(index=False, name=None))
+
+
+def partition_filters(partitions):
+    """DNF filter selecting exactly the given (state, month) partitions."""
+    return [[('state', '=', state), ('month', '=', int(month))] for state, month in sorted(partitions)]
+
+
+def drop_partitions(name, partitions):
+    """Delete the directories holding the given (state, month) partitions."""
+    path = dataset_path(name)
+    if not os.path.isdir(path):
+        return
+    wanted = {(state, int(month)) for state, month in partitions}
+    for state_dir in os.listdir(path):
+        if not state_dir.startswith('state='):
+            continue
+        state = unquote(state_dir[len('state='):])
+        for month_dir in os.listdir(os.path.join(path, state_dir)):
+            if (state, int(month_dir[len('month='):])) in wanted:
+                shutil.rmtree(os.path.join(path, state_dir, month_dir))
+        if not os.listdir(os.path.join(path, state_dir)):
+            os.rmdir(os.path.join(path, state_dir))
+
+
+def replace_partitions(frame, name, partitions):
+    """Rewrite only `partitions` of a dataset with the rows in `frame`.
+
+    Partitions listed but absent from `frame` end up deleted, which is how
+    rows from a retired shard disappear.
+    """
+    if 'month' not in frame.columns:
+        frame = add_month(frame)
+    if _memory is not None:
+        # The disk copy is the one being updated: bring it level with memory
+        # first, then stop serving the old frame
+        if name in _unsaved:
+            _flush(name)
+        _memory.pop(name, None)
+    drop_partitions(name, partitions)
+    if len(frame):
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        ds.write_dataset(table, dataset_path(name), format='parquet', partitioning=_partitioning(),
+                         basename_template='part-{i}.parquet', max_partitions=100_000,
+                         existing_data_behavior='overwrite_or_ignore')
+    if EXPORT_CSV:
+        export_csv(name)
+
+
+def read_dataset(name, columns=None, filters=None):
+    """Read a dataset, pulling only `columns` from partitions matching `filters`.
+
+    `filters` uses the pyarrow/pandas DNF form, e.g. [('state', '=', 'Bihar')].
+    Filters on state and month prune whole directories before any file is
+    opened; filters on other columns are pushed down to the row groups.
+    """
+    frame = pd.read_parquet(dataset_path(name), engine='pyarrow', columns=columns, filters=filters,
+                            partitioning=_partitioning(dictionary=True))
+    return apply_schema(frame)
+
+
+def iter_batches(name, columns, batch_rows, seed=None):
+    """Stream a dataset as frames of about `batch_rows` rows, holding one batch at a time.
+
+    With `seed`, partition files are visited in a shuffled order (a
+    different one per seed), so out-of-core training does not see the data
+    state by state.
+    """
+    if _memory is not None and name in _memory:
+        frame = _select(_memory[name], columns)
+        for start in range(0, len(frame), batch_rows):
+            yield frame.iloc[start:start + batch_rows]
+        return
+    dataset = ds.dataset(dataset_path(name), format='parquet', partitioning=_partitioning(dictionary=True))
+    fragments = list(dataset.get_fragments())
+    if seed is not None:
+        np.random.default_rng(seed).shuffle(fragments)
+    pending, pending_rows = [], 0
+    for fragment in fragments:
+        scanner = ds.Scanner.from_fragment(fragment, schema=dataset.schema, columns=columns, batch_size=batch_rows)
+        for batch in scanner.to_batches():
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if pending_rows >= batch_rows:
+                yield apply_schema(pa.Table.from_batches(pending).to_pandas())
+                pending, pending_rows = [], 0
+    if pending_rows:
+        yield apply_schema(pa.Table.from_batches(pending).to_pandas())
+
+
+def export_csv(name, frame=None):
+    """Write the legacy CSV copy of a dataset."""
+    export = read_dataset(name) if frame is None else frame
+    export = export.drop(columns='month', errors='ignore')
+    export['date'] = decode_dates(export['date']).dt.strftime('%d-%m-%Y').values
+    export.to_csv(CSV_FILES[name], index=False)
+
+
+def save_frame(frame, name):
+    if _memory is not None:
+        _memory[name] = frame if 'month' in frame.columns else add_month(frame)
+        if not _is_checkpoint(name):
+            _unsaved[name] = 'frame'
+            return
+        _unsaved.pop(name, None)
+    write_dataset(frame, name)
+    if EXPORT_CSV:
+        export_csv(name, frame)
+
+
+def load_frame(name, columns=None, filters=None):
+    """Load a dataset from memory or the store, falling back to the legacy CSV."""
+    if _memory is not None and name in _memory:
+        frame = _memory[name]
+        return _select(frame, columns, filters) if columns or filters else frame.copy()
+    if has_dataset(name):
+        return read_dataset(name, columns=columns, filters=filters)
+    if name not in CSV_FILES:
+        raise FileNotFoundError(f"No dataset '{name}' in {STORE_ROOT}")
+    return _select(apply_schema(pd.read_csv(CSV_FILES[name])), columns, filters)
+
+
+def table_path(name):
+    return os.path.join(STORE_ROOT, f'{name}.parquet')
+
+
+def save_table(frame, name):
+    """Save a small frame with no date column as a single, unpartitioned Parquet file."""
+    if _memory is not None:
+        _memory[name] = frame
+        if not _is_checkpoint(name):
+            _unsaved[name] = 'table'
+            return
+        _unsaved.pop(name, None)
+    os.makedirs(STORE_ROOT, exist_ok=True)
+    frame.to_parquet(table_path(name), index=False)
+
+
+def _flush(name):
+    kind = _unsaved.pop(name)
+    if kind == 'frame':
+        write_dataset(_memory[name], name)
+        if EXPORT_CSV:
+            export_csv(name, _memory[name])
+    else:
+        os.makedirs(STORE_ROOT, exist_ok=True)
+        _memory[name].to_parquet(table_path(name), index=False)
+
+
+def flush_memory():
+    """Write every frame an in-process run kept in memory only; returns their names."""
+    names = list(_unsaved)
+    for name in names:
+        _flush(name)
+    return names
+
+
+def load_table(name, columns=None):
+    if _memory is not None and name in _memory:
+        return _select(_memory[name], columns) if columns else _memory[name].copy()
+    return apply_schema(pd.read_parquet(table_path(name), columns=columns))
+
+
+def _select(frame, columns=None, filters=None):
+    """Apply column pruning and `filters` (flat or DNF) to a frame already in memory."""
+    if filters:
+        if 'month' not in frame.columns and any(column == 'month' for column, _, _ in _flatten(filters)):
+            frame = add_month(frame)
+        groups = filters if isinstance(filters[0], list) else [filters]
+        keep = np.zeros(len(frame), dtype=bool)
+        for group in groups:
+            match = np.ones(len(frame), dtype=bool)
+            for column, op, value in group:
+                if op in ('=', '=='):
+                    match &= (frame[column] == value).to_numpy()
+                elif op == 'in':
+                    match &= frame[column].isin(value).to_numpy()
+                else:
+                    raise ValueError(f"Unsupported in-memory filter: {column} {op} {value}")
+            keep |= match
+        frame = frame[keep]
+    return frame[columns] if columns else frame
+
+
+def _flatten(filters):
+    return [condition for group in filters for condition in group] if isinstance(filters[0], list) else filters
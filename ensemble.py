@@ -0,0 +1,62 @@
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.model_selection import StratifiedKFold, cross_val_predict
+
+# Soft voting over members that are already fitted. VotingClassifier.fit
+# refits every member a second time; here the final members are trained
+# once and the ensemble only averages their probabilities. Cross-validation
+# still fits every member once per fold (5 folds x 3 members, the same as
+# cross-validating a VotingClassifier), but those out-of-fold probabilities
+# give the member and the ensemble fold scores together, and step5 keeps
+# them in the model store so a rerun on unchanged data skips the fold fits.
+
+
+class PrefitVotingClassifier(ClassifierMixin, BaseEstimator):
+    """Weighted soft vote of fitted `estimators` ([(name, estimator), ...])."""
+
+    def __init__(self, estimators, weights=None):
+        self.estimators = estimators
+        self.weights = weights
+
+    def fit(self, X=None, y=None):
+        """Check the members agree on their classes; nothing is refitted."""
+        classes = [estimator.classes_ for _, estimator in self.estimators]
+        if any(not np.array_equal(classes[0], other) for other in classes[1:]):
+            raise ValueError("Ensemble members were fitted on different classes")
+        self.classes_ = classes[0]
+        self.named_estimators_ = dict(self.estimators)
+        return self
+
+    def predict_proba(self, X):
+        return soft_vote([estimator.predict_proba(X) for _, estimator in self.estimators], self.weights)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def soft_vote(probabilities, weights=None):
+    """Weighted mean of per-member probability arrays, as VotingClassifier(voting='soft')."""
+    return np.average(np.stack(probabilities), axis=0, weights=weights)
+
+
+def oof_probabilities(estimator, X, y, folds):
+    """Out-of-fold predict_proba of a fresh copy of `estimator` on every row."""
+    return cross_val_predict(estimator, X, y, cv=folds, method='predict_proba', n_jobs=-1)
+
+
+def fold_scores(member_probabilities, y, folds, classes, weights=None, scorer=None):
+    """Per-fold ensemble scores from cached out-of-fold member probabilities.
+
+    `folds` are the (train, test) index pairs the probabilities were
+    produced with; `scorer(y_true, y_pred)` defaults to accuracy.
+    """
+    y = np.asarray(y)
+    predictions = np.asarray(classes)[soft_vote(member_probabilities, weights).argmax(axis=1)]
+    if scorer is None:
+        return np.array([np.mean(predictions[test] == y[test]) for _, test in folds])
+    return np.array([scorer(y[test], predictions[test]) for _, test in folds])
+
+
+def make_folds(X, y, n_splits=5):
+    """The folds cross_val_score(cv=n_splits) uses for a classifier, as a list."""
+    return list(StratifiedKFold(n_splits=n_splits).split(X, y))
@@ -0,0 +1,125 @@
+import glob
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_store import STORE_ROOT
+from rollups import load_rollup
+
+# One table of engineered district features per data version, read by
+# training (step5), batch scoring and the dashboard instead of each
+# rebuilding its own. The version hashes the district rollup the features
+# were built from and FEATURE_SET_VERSION, so the table is rebuilt exactly
+# when the data or the feature definitions change.
+# Layout: aadhaar_store/features/district/<version>.parquet (+ .json metadata)
+FEATURE_ROOT = os.path.join(STORE_ROOT, 'features', 'district')
+# Bump when a feature definition below changes
+FEATURE_SET_VERSION = 1
+# Feature tables kept on disk: the most recently built or read ones
+FEATURE_KEEP = int(os.environ.get('FEATURE_KEEP', 3))
+
+KEY_COLUMNS = ['state', 'district']
+RAW_COLUMNS = ['DLI', 'IGS', 'total_demo_updates', 'total_bio_updates', 'total_enrolments']
+FEATURE_COLS = ['DLI', 'IGS', 'total_demo_updates', 'total_bio_updates', 'total_enrolments',
+                'update_ratio', 'enrolment_efficiency', 'digital_engagement',
+                'volume_score', 'infra_readiness', 'divide_severity_norm']
+
+
+def feature_stats(districts):
+    """Population constants of a set of districts that the engineered features use."""
+    divide_severity = districts['total_demo_updates'].astype('int64') - districts['total_bio_updates'].astype('int64')
+    return {'IGS_max': districts['IGS'].max().item(),
+            'divide_severity_min': divide_severity.min().item(),
+            'divide_severity_max': divide_severity.max().item()}
+
+
+def add_features(districts, stats):
+    """Add the engineered feature columns to raw district aggregates (in place)."""
+    # Signed counts so differences below cannot wrap around
+    totals = ['total_demo_updates', 'total_bio_updates', 'total_enrolments']
+    districts[totals] = districts[totals].astype('int64')
+    districts['update_ratio'] = districts['total_bio_updates'] / (districts['total_demo_updates'] + 1)
+    districts['enrolment_efficiency'] = districts['total_enrolments'] / (
+        districts['total_demo_updates'] + districts['total_bio_updates'] + 1)
+    districts['digital_engagement'] = (
+        districts['DLI'] * 0.4 +
+        districts['update_ratio'] * 0.3 +
+        districts['enrolment_efficiency'] * 0.3
+    )
+    districts['volume_score'] = np.log1p(
+        districts['total_demo_updates'] +
+        districts['total_bio_updates'] +
+        districts['total_enrolments']
+    )
+    districts['infra_readiness'] = 1 - (districts['IGS'] / stats['IGS_max'])
+    districts['divide_severity'] = districts['total_demo_updates'] - districts['total_bio_updates']
+    districts['divide_severity_norm'] = ((districts['divide_severity'] - stats['divide_severity_min'])
+                                         / (stats['divide_severity_max'] - stats['divide_severity_min']))
+    return districts
+
+
+def feature_matrix(districts, medians):
+    """The model's feature columns with infinities and gaps replaced by the training medians."""
+    X = districts[FEATURE_COLS].replace([np.inf, -np.inf], np.nan)
+    return X.fillna(medians)
+
+
+def data_version(districts):
+    """Version of the feature table built from these district aggregates."""
+    digest = hashlib.sha256(f'district-features-v{FEATURE_SET_VERSION}'.encode())
+    raw = districts[KEY_COLUMNS + RAW_COLUMNS].astype({key: str for key in KEY_COLUMNS})
+    digest.update(pd.util.hash_pandas_object(raw, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def feature_path(version):
+    return os.path.join(FEATURE_ROOT, f'{version}.parquet')
+
+
+def build_features(districts):
+    """Feature table and metadata (version, population stats) for district aggregates."""
+    stats = feature_stats(districts)
+    table = add_features(districts[KEY_COLUMNS + RAW_COLUMNS].copy(), stats)
+    meta = {'version': data_version(districts), 'stats': stats, 'districts': len(table),
+            'built_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    return table.reset_index(drop=True), meta
+
+
+def load_features(districts=None):
+    """(feature table, metadata) for the current district rollup, or for `districts`.
+
+    The table is built and saved the first time a data version is seen;
+    after that it is read back as is.
+    """
+    if districts is None:
+        districts = load_rollup('district')
+    path = feature_path(data_version(districts))
+    meta_path = path.replace('.parquet', '.json')
+    if os.path.exists(path) and os.path.exists(meta_path):
+        os.utime(path)  # recently used, so pruning keeps it
+        with open(meta_path, encoding='utf-8') as f:
+            return pd.read_parquet(path), json.load(f)
+
+    table, meta = build_features(districts)
+    os.makedirs(FEATURE_ROOT, exist_ok=True)
+    table.to_parquet(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+    with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2, sort_keys=True)
+    os.replace(meta_path + '.tmp', meta_path)
+    prune_features(current=path)
+    return table, meta
+
+
+def prune_features(keep=FEATURE_KEEP, current=None):
+    """Delete all but the `keep` most recently built or read feature tables (never `current`)."""
+    paths = sorted(glob.glob(os.path.join(FEATURE_ROOT, '*.parquet')), key=os.path.getmtime, reverse=True)
+    for path in paths[keep:]:
+        if path != current:
+            os.remove(path)
+            if os.path.exists(path.replace('.parquet', '.json')):
+                os.remove(path.replace('.parquet', '.json'))
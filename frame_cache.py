@@ -0,0 +1,109 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from data_store import STORE_ROOT
+
+# Read-only copies of dashboard frames, one .npy file per column, loaded with
+# mmap so a cold start maps pages instead of parsing Parquet/CSV and several
+# processes share them through the OS page cache.
+# Layout: aadhaar_store/frame_cache/<name>/{meta.json, <i>.npy}
+CACHE_ROOT = os.path.join(STORE_ROOT, 'frame_cache')
+
+
+def source_fingerprint(paths):
+    """Hash of path, size and mtime of every file under `paths` (files or directories)."""
+    digest = hashlib.sha256()
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, '**', '*'), recursive=True)) if os.path.isdir(path) else [path]
+        for file in files:
+            if os.path.isfile(file):
+                stat = os.stat(file)
+                digest.update(f'{os.path.normpath(file)}|{stat.st_size}|{stat.st_mtime_ns}\n'.encode())
+    return digest.hexdigest()
+
+
+def save_cache(frame, name, fingerprint):
+    """Write `frame` column by column; strings are stored as category codes."""
+    path = os.path.join(CACHE_ROOT, name)
+    os.makedirs(CACHE_ROOT, exist_ok=True)
+    # A private directory per writer, so concurrent rebuilds never share one
+    tmp_path = tempfile.mkdtemp(prefix=f'{name}.', suffix='.tmp', dir=CACHE_ROOT)
+    columns = []
+    for i, column in enumerate(frame.columns):
+        values = frame[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            kind = 'category'
+        elif pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            kind = 'numeric'
+        else:
+            kind = 'object'
+            values = values.astype('category')
+        entry = {'name': column, 'kind': kind}
+        if kind == 'numeric':
+            np.save(os.path.join(tmp_path, f'{i}.npy'), values.to_numpy())
+        else:
+            np.save(os.path.join(tmp_path, f'{i}.npy'), values.cat.codes.to_numpy())
+            entry['categories'] = values.cat.categories.tolist()
+        columns.append(entry)
+    with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'fingerprint': fingerprint, 'columns': columns}, f, ensure_ascii=False)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # A directory cannot be renamed over a non-empty one: move the old copy aside first
+        stale = tmp_path + '.old'
+        try:
+            os.rename(path, stale)
+        except FileNotFoundError:
+            pass
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # Another process installed its copy in between; it is just as fresh
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        shutil.rmtree(stale, ignore_errors=True)
+
+
+def load_cache(name, fingerprint):
+    """Map a cached frame, or return None when it is missing or stale.
+
+    Numeric columns and the codes of categorical columns stay memory-mapped.
+    String (object) columns are rebuilt as object arrays from their codes,
+    so they are materialised in this process's memory.
+    """
+    path = os.path.join(CACHE_ROOT, name)
+    meta_path = os.path.join(path, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta['fingerprint'] != fingerprint:
+        return None
+    columns = {}
+    for i, entry in enumerate(meta['columns']):
+        # Plain ndarray view over the memmap, no copy
+        values = np.asarray(np.load(os.path.join(path, f'{i}.npy'), mmap_mode='r'))
+        if entry['kind'] == 'category':
+            values = pd.Categorical.from_codes(values, entry['categories'])
+        elif entry['kind'] == 'object':
+            categories = np.array(entry['categories'] + [np.nan], dtype=object)
+            values = categories[values]  # code -1 picks the trailing NaN
+        columns[entry['name']] = values
+    return pd.DataFrame(columns, copy=False)
+
+
+def cached_frame(name, sources, build):
+    """Return the cached frame for `sources`, rebuilding it with `build()` when stale."""
+    fingerprint = source_fingerprint(sources)
+    frame = load_cache(name, fingerprint)
+    if frame is None:
+        frame = build()
+        save_cache(frame, name, fingerprint)
+    return frame
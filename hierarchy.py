@@ -0,0 +1,165 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_store import STORE_ROOT, load_table, save_table, table_path
+
+# Pincode -> district -> state index over integer ids, kept up to date at
+# ingest. Districts are numbered in (state, district) order, so the districts
+# of a state are a contiguous id range and district -> state roll-ups are
+# segment sums. Pincodes are kept sorted for binary-search lookup of their
+# district. The (district, pincode) units the merged rows are reported under
+# are stored in district order, so unit -> district roll-ups are segment sums
+# too; a pincode reported under two districts is two units. The index is
+# rebuilt from the number of merged rows per (state, district, pincode), a
+# small table an incremental ingest updates from the refreshed partitions
+# only.
+HIERARCHY_PATH = os.path.join(STORE_ROOT, 'hierarchy.npz')
+PAIRS_TABLE = 'hierarchy_pairs'
+LEVELS = ['state', 'district', 'pincode']
+# Bump when the saved arrays change so the next ingest rebuilds the index
+HIERARCHY_VERSION = 2
+PINCODE_SPAN = 1_000_000  # pincodes are six digits
+
+
+def pair_counts(frame):
+    """Rows per (state, district, pincode) of `frame`."""
+    return frame[LEVELS].astype({'state': str, 'district': str}).value_counts().rename('rows').reset_index()
+
+
+def update_pairs(added, removed=None):
+    """Save and return the row counts per (state, district, pincode).
+
+    Without `removed`, `added` is every merged row. With `removed`, the
+    counts of `added` rows are folded into the saved table minus those of
+    `removed` rows (the old rows of the refreshed partitions).
+    """
+    parts = [pair_counts(added)]
+    if removed is not None:
+        parts += [load_pairs(), pair_counts(removed).assign(rows=lambda counts: -counts['rows'])]
+    pairs = pd.concat(parts, ignore_index=True).groupby(LEVELS, as_index=False)['rows'].sum()
+    pairs = pairs.loc[pairs['rows'] > 0].reset_index(drop=True)
+    save_table(pairs, PAIRS_TABLE)
+    return pairs
+
+
+def has_pairs():
+    return os.path.exists(table_path(PAIRS_TABLE))
+
+
+def load_pairs():
+    return load_table(PAIRS_TABLE)
+
+
+class Hierarchy:
+    def __init__(self, pincodes, pincode_district, ambiguous, unit_pincodes, unit_district,
+                 district_names, district_state, state_names):
+        self.pincodes = pincodes                  # int32, sorted
+        self.pincode_district = pincode_district  # int32 home district id per pincode
+        self.ambiguous = ambiguous                # bool, pincode reported under several districts
+        self.unit_pincodes = unit_pincodes        # int32 pincode per unit, sorted within each district
+        self.unit_district = unit_district        # int32 district id per unit, non-decreasing
+        self.district_names = district_names
+        self.district_state = district_state      # int32 state id per district, non-decreasing
+        self.state_names = state_names
+        self.unit_keys = unit_district.astype('int64') * PINCODE_SPAN + unit_pincodes
+        self.district_starts = np.searchsorted(unit_district, np.arange(len(district_names)))
+        self.state_starts = np.searchsorted(district_state, np.arange(len(state_names)))
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """Build the index from rows per (state, district, pincode) (see pair_counts).
+
+        A pincode reported under several districts gets the one with the
+        most rows as its home district and is flagged as ambiguous.
+        """
+        districts = pairs[['state', 'district']].drop_duplicates().sort_values(['state', 'district'])
+        state_names = np.array(sorted(districts['state'].unique()), dtype=str)
+        district_names = districts['district'].to_numpy(dtype=str)
+        district_state = np.searchsorted(state_names, districts['state'].to_numpy(dtype=str)).astype('int32')
+
+        pairs = pairs.merge(districts.assign(district_id=np.arange(len(districts), dtype='int32')),
+                            on=['state', 'district'])
+        units = pairs.sort_values(['district_id', 'pincode'])
+        # Most rows first, then lowest id, so the first row per pincode is its home district
+        pairs = pairs.sort_values(['pincode', 'rows', 'district_id'], ascending=[True, False, True])
+        ambiguous = pairs.groupby('pincode', sort=True)['district_id'].nunique() > 1
+        home = pairs.drop_duplicates('pincode')
+        return cls(home['pincode'].to_numpy(dtype='int32'), home['district_id'].to_numpy(dtype='int32'),
+                   ambiguous.to_numpy(), units['pincode'].to_numpy(dtype='int32'),
+                   units['district_id'].to_numpy(dtype='int32'), district_names, district_state, state_names)
+
+    def lookup(self, pincodes):
+        """Home district id of each pincode by binary search, -1 where unknown."""
+        pincodes = np.asarray(pincodes)
+        positions = np.minimum(np.searchsorted(self.pincodes, pincodes), len(self.pincodes) - 1)
+        return np.where(self.pincodes[positions] == pincodes, self.pincode_district[positions], -1).astype('int32')
+
+    def district_ids(self, states, districts):
+        """District id of each (state, district) name pair."""
+        index = pd.MultiIndex.from_arrays([self.state_names[self.district_state], self.district_names])
+        ids = index.get_indexer(pd.MultiIndex.from_arrays([np.asarray(states, dtype=str),
+                                                           np.asarray(districts, dtype=str)]))
+        if (ids < 0).any():
+            raise KeyError("Districts missing from the hierarchy index; rerun analysis.py")
+        return ids
+
+    def unit_ids(self, district_ids, pincodes):
+        """Unit id of each (district id, pincode) pair by binary search."""
+        keys = np.asarray(district_ids, dtype='int64') * PINCODE_SPAN + np.asarray(pincodes, dtype='int64')
+        ids = np.minimum(np.searchsorted(self.unit_keys, keys), len(self.unit_keys) - 1)
+        if (self.unit_keys[ids] != keys).any():
+            raise KeyError("Pincodes missing from the hierarchy index; rerun analysis.py")
+        return ids
+
+    def unit_totals(self, unit_ids, values):
+        """Sum `values` of arbitrary rows into one value per unit (sorted segment sums)."""
+        order = np.argsort(unit_ids, kind='stable')
+        ids = np.asarray(unit_ids)[order]
+        starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]]) if len(ids) else ids
+        values = np.asarray(values)
+        totals = np.zeros((len(self.unit_keys),) + values.shape[1:], dtype=np.result_type(values, np.int64))
+        if len(ids):
+            totals[ids[starts]] = np.add.reduceat(values[order], starts, axis=0)
+        return totals
+
+    def district_totals(self, unit_values):
+        """Roll values aligned with unit ids up to districts (segment sums)."""
+        return _segment_sums(np.asarray(unit_values), self.district_starts)
+
+    def state_totals(self, district_values):
+        """Roll values aligned with district ids up to states (segment sums)."""
+        return _segment_sums(np.asarray(district_values), self.state_starts)
+
+    def save(self, path=HIERARCHY_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, version=HIERARCHY_VERSION, pincodes=self.pincodes,
+                 pincode_district=self.pincode_district, ambiguous=self.ambiguous,
+                 unit_pincodes=self.unit_pincodes, unit_district=self.unit_district,
+                 district_names=self.district_names, district_state=self.district_state,
+                 state_names=self.state_names)
+        os.replace(tmp_path, path)
+
+
+def load_hierarchy(path=HIERARCHY_PATH):
+    with np.load(path) as saved:
+        return Hierarchy(**{name: saved[name] for name in saved.files if name != 'version'})
+
+
+def has_current_hierarchy(path=HIERARCHY_PATH):
+    if not os.path.exists(path):
+        return False
+    with np.load(path) as saved:
+        return 'version' in saved.files and int(saved['version']) == HIERARCHY_VERSION
+
+
+def _segment_sums(values, starts):
+    """np.add.reduceat over sorted segment starts, giving 0 for empty segments."""
+    sums = np.zeros((len(starts),) + values.shape[1:], dtype=np.result_type(values, np.int64))
+    ends = np.append(starts[1:], len(values))
+    filled = ends > starts
+    if filled.any():
+        sums[filled] = np.add.reduceat(values, starts[filled], axis=0)
+    return sums
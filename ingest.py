@@ -0,0 +1,240 @@
+import glob
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from schema import apply_schema, encode_dates
+from validation import Quarantine, validate_chunk
+
+# Columns shared by every UIDAI dump
+KEYS = ['date', 'state', 'district', 'pincode']
+
+# Count columns carried by each dataset
+SOURCES = {
+    'enrolment': ['age_0_5', 'age_5_17', 'age_18_greater'],
+    'demographic': ['demo_age_5_17', 'demo_age_17_'],
+    'biometric': ['bio_age_5_17', 'bio_age_17_'],
+}
+
+DATA_ROOT = '.'
+
+# Rows parsed per chunk, and how many pre-aggregated rows may pile up
+# before they are folded back together. Together these bound peak memory.
+CHUNK_ROWS = int(os.environ.get('INGEST_CHUNK_ROWS', 250_000))
+COMPACT_ROWS = int(os.environ.get('INGEST_COMPACT_ROWS', 1_000_000))
+
+# Worker processes for parallel ingest; 1 keeps everything in-process and
+# 0 means one worker per CPU core.
+INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', 1))
+
+_SHARD_RANGE = re.compile(r'_(\d+)_(\d+)\.csv$')
+
+
+def discover_shards(source, root=DATA_ROOT):
+    """Return every range-named CSV shard for a dataset, ordered by row range."""
+    pattern = os.path.join(root, f'api_data_aadhar_{source}', '**', f'api_data_aadhar_{source}_*.csv')
+    shards = glob.glob(pattern, recursive=True)
+
+    def shard_start(path):
+        match = _SHARD_RANGE.search(path)
+        return (int(match.group(1)) if match else -1, path)
+
+    return sorted(shards, key=shard_start)
+
+
+def iter_chunks(path, source, chunk_rows=CHUNK_ROWS, quarantine=None):
+    """Yield bounded-size, validated chunks of one shard, reading only the known columns.
+
+    Rows failing a validation rule are dropped here and, given a
+    Quarantine, written to it with their reason codes.
+    """
+    usecols = KEYS + SOURCES[source]
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunk_rows):
+        chunk, rejected, tally = validate_chunk(chunk, SOURCES[source])
+        if quarantine is not None:
+            quarantine.add(rejected, tally)
+        # Integer dates group faster and take a quarter of the memory
+        chunk['date'] = encode_dates(chunk['date'])
+        yield chunk
+
+
+def reduce_to_keys(frame, source):
+    """Collapse a frame to one row per (date, state, district, pincode)."""
+    values = [column for column in frame.columns if column not in KEYS]
+    return frame.groupby(KEYS, sort=False, as_index=False)[values].sum()
+
+
+def empty_source(source):
+    frame = pd.DataFrame({'date': pd.Series(dtype='int32'), 'state': pd.Series(dtype=str),
+                          'district': pd.Series(dtype=str), 'pincode': pd.Series(dtype='int64')})
+    for column in SOURCES[source]:
+        frame[column] = pd.Series(dtype='int64')
+    return frame
+
+
+class TotalsFolder:
+    """Combine already-reduced frames for one source into per-key totals.
+
+    Partials are buffered and folded together whenever they exceed
+    COMPACT_ROWS, so memory grows with the number of distinct keys rather
+    than with the number of raw rows.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.partials = []
+        self.buffered = 0
+
+    def add(self, reduced):
+        self.partials.append(reduced)
+        self.buffered += len(reduced)
+        if self.buffered > COMPACT_ROWS:
+            self.partials = [self.result()]
+            self.buffered = len(self.partials[0])
+
+    def result(self):
+        if not self.partials:
+            return empty_source(self.source)
+        if len(self.partials) == 1:
+            return self.partials[0]
+        return reduce_to_keys(pd.concat(self.partials, ignore_index=True), self.source)
+
+
+def fold_partials(reduced_frames, source):
+    folder = TotalsFolder(source)
+    for reduced in reduced_frames:
+        folder.add(reduced)
+    return folder.result()
+
+
+def reduce_shard(path, source, chunk_rows=CHUNK_ROWS):
+    """Parse one shard and pre-aggregate it to per-key totals.
+
+    Returns (totals, rejected): `rejected` counts the rows each validation
+    rule turned away. `shard_count` records that this shard reported the
+    key; summed across shards it says when a key can be dropped because
+    every shard that reported it has been retired.
+    """
+    quarantine = Quarantine(source, path)
+    totals = fold_partials((reduce_to_keys(chunk, source)
+                            for chunk in iter_chunks(path, source, chunk_rows, quarantine)), source)
+    totals['shard_count'] = 1
+    return totals, dict(quarantine.counts)
+
+
+def iter_shard_totals(shards, workers=INGEST_WORKERS, chunk_rows=CHUNK_ROWS):
+    """Yield (source, path, totals, rejected) for every shard in `shards` ({source: [paths]}).
+
+    With more than one worker, each shard is parsed and pre-aggregated in
+    its own process and results are yielded in completion order.
+    """
+    jobs = [(source, path) for source, paths in shards.items() for path in paths]
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        for source, path in jobs:
+            yield (source, path) + reduce_shard(path, source, chunk_rows)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = {pool.submit(reduce_shard, path, source, chunk_rows): (source, path)
+                   for source, path in jobs}
+        for future in as_completed(futures):
+            source, path = futures[future]
+            yield (source, path) + future.result()
+
+
+def canonical_totals(totals, source, resolver):
+    """Per-key totals with canonical state/district names.
+
+    Spellings that collapse into one name become one key, and their
+    shard_counts add up; retired totals go through the same function, so
+    the count still reaches zero exactly when every contributing shard is
+    gone.
+    """
+    return reduce_to_keys(resolver.canonicalise(totals), source)
+
+
+def read_sources(shards, workers=INGEST_WORKERS, chunk_rows=CHUNK_ROWS, on_shard=None, resolver=None):
+    """Read every source in `shards` into per-key totals.
+
+    Shards are folded into their source's totals as they complete, under
+    their raw names. With a NameResolver, the (state, district) pairs of
+    each shard are counted on the way; once every shard is in, names are
+    resolved most frequent spelling first, whatever order shards finished
+    in, and each source's folded totals are canonicalised once, in the
+    parent process, so one resolution cache sees every shard.
+    `on_shard(source, path, totals, rejected)` is called for each shard
+    before it is folded in, with its raw-named totals and the per-rule
+    counts of rows validation rejected.
+    """
+    folders = {source: TotalsFolder(source) for source in shards}
+    pair_rows = Counter()
+    for source, path, totals, rejected in iter_shard_totals(shards, workers, chunk_rows):
+        if resolver is not None:
+            pair_rows.update(totals.groupby(['state', 'district'], sort=False).size().to_dict())
+        if on_shard is not None:
+            on_shard(source, path, totals, rejected)
+        folders[source].add(totals)
+    if resolver is None:
+        return {source: folder.result() for source, folder in folders.items()}
+    resolver.prime(pair_rows)
+    return {source: canonical_totals(folder.result(), source, resolver) for source, folder in folders.items()}
+
+
+MERGE_MODE = os.environ.get('MERGE_MODE', 'keyed')
+
+
+def merge_sources(frames, mode=MERGE_MODE):
+    """Join the per-source frames on KEYS.
+
+    'keyed' first makes each source unique per key and then aligns all of
+    them on the sorted key index in a single outer join, so the result has
+    exactly one row per distinct key. 'outer' is the old chained
+    pd.merge, kept for comparison; it multiplies rows whenever a key
+    repeats inside a source.
+    """
+    # Every source carries its own shard_count; keep them apart until the join is done
+    frames = {source: frame.rename(columns={'shard_count': f'shard_count_{source}'})
+              for source, frame in frames.items()}
+
+    if mode == 'outer':
+        merged = None
+        for frame in frames.values():
+            merged = frame if merged is None else pd.merge(merged, frame, on=KEYS, how='outer')
+    else:
+        indexed = []
+        for source, frame in frames.items():
+            if frame.duplicated(KEYS).any():
+                frame = reduce_to_keys(frame, source)
+            indexed.append(frame.set_index(KEYS).sort_index())
+        merged = pd.concat(indexed, axis=1, join='outer').reset_index()
+
+    shard_counts = [column for column in merged.columns if column.startswith('shard_count_')]
+    if shard_counts:
+        merged['shard_count'] = merged[shard_counts].fillna(0).sum(axis=1)
+        merged = merged.drop(columns=shard_counts)
+    return apply_schema(merged)
+
+
+def apply_delta(existing, added, retired):
+    """Fold new shard totals into `existing` merged rows and subtract retired ones.
+
+    `added` and `retired` are lists of per-source key totals. Keys whose
+    shard_count drops to zero were only reported by retired shards and are
+    removed.
+    """
+    values = [column for columns in SOURCES.values() for column in columns] + ['shard_count']
+    parts = [existing.drop(columns='month', errors='ignore')]
+    parts += added
+    parts += [frame.assign(**{column: -frame[column].astype('int64')
+                              for column in frame.columns if column in values})
+              for frame in retired]
+    combined = pd.concat([part.astype({'state': str, 'district': str}) for part in parts], ignore_index=True)
+    combined[values] = combined.reindex(columns=values).fillna(0).astype('int64')
+
+    totals = combined.groupby(KEYS, sort=False, as_index=False)[values].sum()
+    return apply_schema(totals.loc[totals['shard_count'] > 0, KEYS + values].reset_index(drop=True))
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import shutil
+
+import pandas as pd
+
+from data_store import STORE_ROOT
+
+# Record of every shard folded into the merged dataset, plus the
+# (state, month) partitions that step3 still has to recompute.
+MANIFEST_PATH = os.path.join(STORE_ROOT, 'ingest_manifest.json')
+
+# Per-shard key totals under their raw state/district names, kept so a
+# changed or removed shard can be subtracted from the merged dataset
+# without re-reading everything else.
+SHARD_TOTALS_ROOT = os.path.join(STORE_ROOT, 'shard_totals')
+
+FULL_REBUILD = os.environ.get('FULL_REBUILD', '0') == '1'
+
+
+def empty_manifest():
+    return {'shards': {}, 'pending_partitions': [], 'full_rebuild': True}
+
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return empty_manifest()
+    with open(MANIFEST_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest):
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    tmp_path = MANIFEST_PATH + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def file_checksum(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(path, source, previous=None):
+    """Size, mtime and checksum of a shard.
+
+    The checksum is reused when size and mtime match the previous entry, so
+    an unchanged history is never re-hashed.
+    """
+    stat = os.stat(path)
+    if previous and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns:
+        return previous
+    return {'source': source, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+            'sha256': file_checksum(path)}
+
+
+def plan_ingest(shards, manifest):
+    """Compare discovered shards ({source: [paths]}) with the manifest.
+
+    Returns (to_read, fingerprints, retired): the new or changed shards to
+    parse, the fingerprint of every shard currently on disk, and the old
+    manifest entries whose contribution has to be subtracted.
+    """
+    known = manifest['shards']
+    to_read = {source: [] for source in shards}
+    fingerprints = {}
+    retired = []
+    for source, paths in shards.items():
+        for path in paths:
+            key = os.path.normpath(path)
+            previous = known.get(key)
+            current = fingerprint(path, source, previous)
+            if previous is not None and previous['sha256'] == current['sha256'] and 'rejected' in previous:
+                # Same bytes, same validation outcome
+                current.setdefault('rejected', previous['rejected'])
+            fingerprints[key] = current
+            if previous is None or previous['sha256'] != current['sha256']:
+                to_read[source].append(path)
+                if previous is not None:
+                    retired.append(previous)
+    retired += [entry for key, entry in known.items() if key not in fingerprints]
+    return to_read, fingerprints, retired
+
+
+def shard_totals_path(source, checksum):
+    return os.path.join(SHARD_TOTALS_ROOT, source, f'{checksum}.parquet')
+
+
+def save_shard_totals(source, checksum, totals):
+    path = shard_totals_path(source, checksum)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    totals.to_parquet(path, index=False)
+
+
+def load_shard_totals(entry):
+    return pd.read_parquet(shard_totals_path(entry['source'], entry['sha256']))
+
+
+def reset_shard_totals():
+    if os.path.isdir(SHARD_TOTALS_ROOT):
+        shutil.rmtree(SHARD_TOTALS_ROOT)
+
+
+def drop_shard_totals(entry):
+    path = shard_totals_path(entry['source'], entry['sha256'])
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def mark_pending(manifest, partitions):
+    pending = {(state, int(month)) for state, month in manifest['pending_partitions']}
+    pending |= {(state, int(month)) for state, month in partitions}
+    manifest['pending_partitions'] = sorted([state, month] for state, month in pending)
+
+
+def pending_partitions(manifest):
+    return {(state, int(month)) for state, month in manifest['pending_partitions']}
@@ -0,0 +1,109 @@
+import hashlib
+import inspect
+import json
+import os
+
+import numpy as np
+
+# Per-row metrics computed by step3 in a single chunked pass.
+# Each metric reads input columns (or metrics registered before it) and
+# writes straight into its slice of a preallocated output array, so adding
+# an index costs one more output column, not another scan of the frame or
+# full-size temporaries.
+CHUNK_ROWS = int(os.environ.get('METRIC_CHUNK_ROWS', 65_536))
+
+METRICS = {}
+
+
+def register_metric(name, dtype, inputs):
+    """Register `compute(*inputs, out, scratch)` as the metric `name`.
+
+    `out` is the metric's output slice for the current chunk; `scratch` is
+    a float64 buffer of the same length shared by all metrics.
+    Metrics run in registration order, so a metric may use any registered
+    before it as an input.
+    """
+    def register(compute):
+        METRICS[name] = {'dtype': dtype, 'inputs': inputs, 'compute': compute}
+        return compute
+    return register
+
+
+@register_metric('total_demo_updates', 'uint32', ['demo_age_5_17', 'demo_age_17_'])
+def total_demo_updates(age_5_17, age_17, out, scratch):
+    np.add(age_5_17, age_17, out=out, dtype='uint32')
+
+
+@register_metric('total_bio_updates', 'uint32', ['bio_age_5_17', 'bio_age_17_'])
+def total_bio_updates(age_5_17, age_17, out, scratch):
+    np.add(age_5_17, age_17, out=out, dtype='uint32')
+
+
+@register_metric('total_enrolments', 'uint32', ['age_0_5', 'age_5_17', 'age_18_greater'])
+def total_enrolments(age_0_5, age_5_17, age_18, out, scratch):
+    np.add(age_0_5, age_5_17, out=out, dtype='uint32')
+    np.add(out, age_18, out=out)
+
+
+@register_metric('DLI', 'float32', ['total_bio_updates', 'total_demo_updates'])
+def digital_literacy_index(bio, demo, out, scratch):
+    """Biometric / demographic updates, 0 without demographic updates, capped at 5."""
+    out[:] = 0
+    np.divide(bio, demo, out=out, where=demo > 0)
+    np.clip(out, 0, 5, out=out)
+
+
+@register_metric('IGS', 'float32', ['total_enrolments', 'total_bio_updates'])
+def infrastructure_gap_score(enrolments, bio, out, scratch):
+    """(enrolments - biometric updates) / enrolments, 0 without enrolments.
+
+    Signed: biometric updates can exceed enrolments.
+    """
+    np.subtract(enrolments, bio, out=scratch, dtype='float64')
+    out[:] = 0
+    np.divide(scratch, enrolments, out=out, where=enrolments > 0)
+
+
+@register_metric('update_ratio', 'float32', ['total_bio_updates', 'total_demo_updates'])
+def update_ratio(bio, demo, out, scratch):
+    """Biometric updates per demographic update, smoothed by +1."""
+    np.add(demo, 1, out=scratch, dtype='float64')
+    np.divide(bio, scratch, out=out)
+
+
+def metrics_signature():
+    """Hash of every registered metric's name, dtype, inputs and code.
+
+    step3 keeps it in the ingest manifest and recomputes every partition
+    when it changes, so no partition is left without a new metric column.
+    """
+    described = [[name, metric['dtype'], metric['inputs'], inspect.getsource(metric['compute'])]
+                 for name, metric in METRICS.items()]
+    return hashlib.sha256(json.dumps(described).encode()).hexdigest()
+
+
+def compute_metrics(frame, names=None, chunk_rows=CHUNK_ROWS):
+    """Add the metrics `names` (default: all registered) as columns of `frame`."""
+    names = list(METRICS) if names is None else [name for name in METRICS if name in names]
+    rows = len(frame)
+    outputs = {name: np.empty(rows, dtype=METRICS[name]['dtype']) for name in names}
+    inputs = {}
+    for name in names:
+        for column in METRICS[name]['inputs']:
+            if column not in outputs and column not in inputs:
+                inputs[column] = frame[column].to_numpy()
+    scratch = np.empty(min(chunk_rows, rows), dtype='float64')
+
+    for start in range(0, rows, chunk_rows):
+        stop = min(start + chunk_rows, rows)
+        for name in names:
+            metric = METRICS[name]
+            args = [outputs[column][start:stop] if column in outputs else inputs[column][start:stop]
+                    for column in metric['inputs']]
+            metric['compute'](*args, out=outputs[name][start:stop], scratch=scratch[:stop - start])
+
+    # Hand each output over and drop our reference, so a copying
+    # assignment never holds two full sets of outputs at once
+    for name in names:
+        frame[name] = outputs.pop(name)
+    return frame
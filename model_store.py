@@ -0,0 +1,119 @@
+import glob
+import hashlib
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+from data_store import STORE_ROOT
+
+# Fitted models and preprocessors saved with joblib, one file per version.
+# A version's key hashes the training data, the estimator's parameters and
+# the scikit-learn version, so a script retrains only when one of them
+# changes. latest.json points consumers at the newest version of each model.
+# Layout: aadhaar_store/models/<name>/<key>.joblib
+MODEL_ROOT = os.path.join(STORE_ROOT, 'models')
+MODEL_CACHE = os.environ.get('MODEL_CACHE', '1') != '0'
+# Versions kept per model: the most recently saved or loaded ones
+MODEL_KEEP = int(os.environ.get('MODEL_KEEP', 3))
+
+
+def artifact_key(data, params):
+    """Hash of the training `data` (frames, series or arrays) and `params`."""
+    digest = hashlib.sha256()
+    for part in data:
+        if isinstance(part, (pd.DataFrame, pd.Series)):
+            digest.update(repr(list(part.columns) if isinstance(part, pd.DataFrame) else part.name).encode())
+            digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+        else:
+            part = np.ascontiguousarray(part)
+            digest.update(f'{part.dtype}{part.shape}'.encode())
+            digest.update(part.tobytes())
+    digest.update(json.dumps(params, sort_keys=True, default=repr).encode())
+    digest.update(sklearn.__version__.encode())
+    return digest.hexdigest()[:16]
+
+
+def artifact_path(name, key):
+    return os.path.join(MODEL_ROOT, name, f'{key}.joblib')
+
+
+def save_artifact(name, key, model, info=None):
+    path = artifact_path(name, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, path)
+    set_latest(name, key, info)
+    prune_artifacts(name)
+
+
+def prune_artifacts(name, keep=MODEL_KEEP):
+    """Delete all but the `keep` most recently saved or loaded versions of `name` (never the latest)."""
+    latest = artifact_path(name, latest_key(name))
+    paths = sorted(glob.glob(os.path.join(MODEL_ROOT, name, '*.joblib')), key=os.path.getmtime, reverse=True)
+    for path in paths[keep:]:
+        if path != latest:
+            os.remove(path)
+
+
+def set_latest(name, key, info=None):
+    latest = {'key': key, 'saved_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'sklearn_version': sklearn.__version__, **(info or {})}
+    tmp_path = os.path.join(MODEL_ROOT, name, 'latest.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(latest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, os.path.join(MODEL_ROOT, name, 'latest.json'))
+
+
+def latest_info(name):
+    """The latest.json entry of `name` (key plus the info it was saved with), or None."""
+    path = os.path.join(MODEL_ROOT, name, 'latest.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def latest_key(name):
+    info = latest_info(name)
+    return info and info['key']
+
+
+def load_artifact(name, key=None):
+    """The saved `name` model with `key` (default: the latest), or None."""
+    key = key or latest_key(name)
+    if key is None or not os.path.exists(artifact_path(name, key)):
+        return None
+    return joblib.load(artifact_path(name, key))
+
+
+def cached_artifact(name, key, build, info=None):
+    """Load `name` version `key`, or build and save it. Returns (artifact, loaded)."""
+    if MODEL_CACHE:
+        artifact = load_artifact(name, key)
+        if artifact is not None:
+            os.utime(artifact_path(name, key))  # recently used, so pruning keeps it
+            latest = latest_info(name)
+            # Switching back to an older version makes it the latest again
+            if latest is None or latest['key'] != key or any(latest.get(field) != value
+                                                             for field, value in (info or {}).items()):
+                set_latest(name, key, info)
+            return artifact, True
+    artifact = build()
+    save_artifact(name, key, artifact, info)
+    return artifact, False
+
+
+def fit_cached(name, estimator, X, y=None, info=None):
+    """Fit `estimator` on (X, y) unless an artifact for the same data and parameters exists.
+
+    Returns (fitted estimator, loaded).
+    """
+    data = [X] if y is None else [X, y]
+    key = artifact_key(data, {'estimator': type(estimator).__name__, 'params': estimator.get_params()})
+    return cached_artifact(name, key, lambda: estimator.fit(X) if y is None else estimator.fit(X, y), info)
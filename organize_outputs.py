@@ -2,6 +2,8 @@ import os
 import shutil
 from datetime import datetime
 
+from data_store import STORE_ROOT, dataset_path
+
 print("="*80)
 print("ORGANIZING OUTPUT FILES")
 print("="*80)
@@ -17,8 +19,6 @@ print(f"\n✅ Created folder: {output_folder}")
 # Define output files to move
 output_files = {
     'CSV Files': [
-        'merged_aadhaar_data.csv',
-        'processed_aadhaar_data.csv',
         'district_clusters.csv',
         'final_summary_statistics.csv'
     ],
@@ -55,6 +55,19 @@ for category, files in output_files.items():
             print(f"  ❌ {file} (not found)")
             total_missing += 1
 
+# Copy the partitioned merged and processed datasets; the rest of the store
+# (shard totals, models, caches, pipeline state) stays where it is
+print(f"\nData Store:")
+for name in ['merged', 'processed']:
+    source = dataset_path(name)
+    if os.path.isdir(source):
+        shutil.copytree(source, os.path.join(output_folder, os.path.basename(STORE_ROOT), name), dirs_exist_ok=True)
+        print(f"  ✅ {source}/")
+        total_moved += 1
+    else:
+        print(f"  ❌ {source}/ (not found)")
+        total_missing += 1
+
 # Create a README file in the output folder
 readme_content = f"""# Digital Divide Predictor - Output Files
 
@@ -62,9 +75,11 @@ Generated on: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
 
 ## Contents
 
+### Data Store ({STORE_ROOT}/)
+- **merged/**: Combined dataset from enrolment, demographic, and biometric updates (Parquet, partitioned by state/month)
+- **processed/**: Cleaned and processed data with calculated metrics (Parquet, partitioned by state/month)
+
 ### CSV Files
-- **merged_aadhaar_data.csv**: Combined dataset from enrolment, demographic, and biometric updates
-- **processed_aadhaar_data.csv**: Cleaned and processed data with calculated metrics
 - **district_clusters.csv**: District-level clustering results with DLI and IGS scores
 - **final_summary_statistics.csv**: Summary statistics from the final report
 
@@ -0,0 +1,87 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+# Every risk label in the project comes from the rule tables below. Rules
+# are checked in order and the first match wins; each table is applied to
+# whole columns with boolean masks, so labelling costs a few array
+# comparisons whatever the number of rows (districts or pincode-level
+# records).
+
+# Risk level of a row: (level, DLI below, IGS above). None means "any";
+# 'median' is the IGS median of the frame being labelled (or the one given).
+RISK_RULES = [
+    (2, 0.10, None),       # High risk
+    (1, 0.20, 'median'),   # Medium risk: low DLI with a wide infrastructure gap
+    (1, 0.15, None),       # Medium risk
+]
+DEFAULT_RISK_LEVEL = 0     # Low risk
+RISK_LEVEL_LABELS = {0: 'Thriving', 1: 'Struggling', 2: 'Critical'}
+
+# Band of a (mean) DLI value: (DLI above, label)
+DLI_BANDS = [
+    (0.40, 'Thriving'),
+    (0.25, 'Progressing'),
+    (0.15, 'Struggling'),
+    (0.05, 'Critical'),
+]
+DEFAULT_DLI_BAND = 'Emergency'
+
+# Binary target of the district at-risk classifier (step5): DLI below this
+AT_RISK_DLI = 0.20
+
+
+def _first_match(conditions, choices, default):
+    """Like np.select, but straight into an int8 array: much faster on millions of rows."""
+    out = np.full(len(conditions[0]) if conditions else 0, default, dtype='int8')
+    # Last rule first, so earlier rules overwrite later ones where both match
+    for condition, choice in zip(reversed(conditions), reversed(choices)):
+        out = np.where(condition, np.int8(choice), out)
+    return out
+
+
+def risk_levels(frame, igs_median=None):
+    """Risk level (0-2, int8) of every row of a frame with DLI and IGS columns."""
+    dli = frame['DLI'].to_numpy()
+    igs = frame['IGS'].to_numpy()
+    if igs_median is None:
+        igs_median = frame['IGS'].median()
+    conditions = []
+    for _, dli_below, igs_above in RISK_RULES:
+        condition = dli < dli_below
+        if igs_above is not None:
+            condition &= igs > (igs_median if igs_above == 'median' else igs_above)
+        conditions.append(condition)
+    return _first_match(conditions, [level for level, _, _ in RISK_RULES], DEFAULT_RISK_LEVEL)
+
+
+def risk_level_labels(levels):
+    """Labels ('Thriving' / 'Struggling' / 'Critical') for risk levels, as a categorical."""
+    names = [RISK_LEVEL_LABELS[level] for level in range(len(RISK_LEVEL_LABELS))]
+    return pd.Categorical.from_codes(np.asarray(levels), categories=names)
+
+
+def dli_bands(dli):
+    """DLI band label ('Thriving' ... 'Emergency') of every value, as a categorical."""
+    dli = np.asarray(dli)
+    names = [label for _, label in DLI_BANDS] + [DEFAULT_DLI_BAND]
+    codes = _first_match([dli > above for above, _ in DLI_BANDS], range(len(DLI_BANDS)), len(DLI_BANDS))
+    return pd.Categorical.from_codes(codes, categories=names)
+
+
+def at_risk(dli):
+    """1 where a DLI value is below AT_RISK_DLI, else 0 (int8)."""
+    return (np.asarray(dli) < AT_RISK_DLI).astype('int8')
+
+
+if __name__ == '__main__':
+    from data_store import load_frame
+
+    rows = load_frame('processed', columns=['DLI', 'IGS'])
+    started = time.perf_counter()
+    levels = risk_levels(rows)
+    labels = risk_level_labels(levels)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"Labelled {len(rows):,} pincode-level rows in {elapsed:.1f} ms")
+    print(pd.Series(labels).value_counts())
@@ -0,0 +1,163 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_store import (has_dataset, load_frame, load_table, partition_filters, replace_partitions,
+                        save_frame, save_table, table_path)
+from hierarchy import load_hierarchy
+from schema import TOTAL_COLUMNS, apply_schema
+
+# Pre-aggregated views of the processed data, written by step3 so the later
+# steps and the dashboard never regroup the full pincode-level frame.
+# Rollups keep sums plus the number of processed rows behind each group, so
+# the row-level DLI/IGS mean of any coarser grain is sum / row_count.
+ROLLUP_GRAINS = {
+    'district_date': ['state', 'district', 'date'],
+    'state_date': ['state', 'date'],
+    'district': ['state', 'district'],
+    'state': ['state'],
+}
+SUM_COLUMNS = TOTAL_COLUMNS + ['DLI_sum', 'IGS_sum', 'row_count']
+
+# All-time running accumulators and the dated rollup each one is folded from.
+# A full step3 run sums the rows into the (district, pincode) units of the
+# hierarchy index and rolls those up to districts as segment sums. An
+# incremental run subtracts the old rows of the refreshed partitions and
+# adds the new ones to the district totals, so the work is proportional to
+# the changed data, not to the history. State totals are then one segment
+# sum over the districts of the hierarchy index.
+ACCUMULATORS = {'district': 'district_date', 'state': 'state_date'}
+
+
+def rollup_name(grain):
+    return f'processed_{grain}'
+
+
+def _with_sums(frame):
+    if 'row_count' not in frame.columns:
+        frame = frame.assign(DLI_sum=frame['DLI'].astype('float64'),
+                             IGS_sum=frame['IGS'].astype('float64'), row_count=1)
+    return frame
+
+
+def rollup(frame, keys):
+    """Aggregate processed rows, or a finer rollup, to the `keys` grain."""
+    frame = _with_sums(frame)
+    grouped = frame.groupby(keys, observed=True)[SUM_COLUMNS].sum().reset_index()
+    return apply_schema(grouped)
+
+
+def with_means(frame):
+    """Add the DLI/IGS row means and the update ratio to a rollup."""
+    frame['DLI'] = frame['DLI_sum'] / frame['row_count']
+    frame['IGS'] = frame['IGS_sum'] / frame['row_count']
+    frame['update_ratio'] = frame['total_bio_updates'] / (frame['total_demo_updates'].astype('float64') + 1)
+    return frame
+
+
+def fold(accumulator, keys, added, removed=None):
+    """Add the `added` rollup rows to `accumulator` and subtract the `removed` ones.
+
+    Groups left with no rows behind them are dropped.
+    """
+    parts = [accumulator, added]
+    if removed is not None:
+        parts.append(removed.assign(**{column: -removed[column].astype('float64') for column in SUM_COLUMNS}))
+    # Categorical keys may carry different categories in each part; numeric
+    # keys (pincode, date) keep their type
+    text_keys = [key for key in keys if not pd.api.types.is_numeric_dtype(accumulator[key])]
+    combined = pd.concat([part[keys + SUM_COLUMNS].astype({key: str for key in text_keys}) for part in parts],
+                         ignore_index=True)
+    totals = combined.groupby(keys, sort=False, as_index=False)[SUM_COLUMNS].sum()
+    totals = totals.loc[totals['row_count'] > 0].reset_index(drop=True)
+    # Integer sums are exact in float64 well past any realistic count
+    totals[TOTAL_COLUMNS + ['row_count']] = totals[TOTAL_COLUMNS + ['row_count']].round().astype('int64')
+    return apply_schema(totals)
+
+
+def has_rollups():
+    return (all(has_dataset(rollup_name(grain)) for grain in ACCUMULATORS.values())
+            and all(os.path.exists(table_path(rollup_name(grain))) for grain in ACCUMULATORS))
+
+
+def _totals_frame(values, keys):
+    """A rollup frame from SUM_COLUMNS values aligned with the `keys` columns; empty groups dropped."""
+    totals = pd.DataFrame(values, columns=SUM_COLUMNS)
+    for position, (key, column) in enumerate(keys.items()):
+        totals.insert(position, key, column)
+    totals = totals.loc[totals['row_count'] > 0].reset_index(drop=True)
+    totals[TOTAL_COLUMNS + ['row_count']] = totals[TOTAL_COLUMNS + ['row_count']].round().astype('int64')
+    return apply_schema(totals)
+
+
+def unit_sums(hierarchy, frame):
+    """SUM_COLUMNS of processed rows (or a pincode-grain rollup) per (district, pincode) unit of the index."""
+    ids = hierarchy.unit_ids(hierarchy.district_ids(frame['state'], frame['district']), frame['pincode'])
+    return hierarchy.unit_totals(ids, _with_sums(frame)[SUM_COLUMNS].to_numpy(dtype='float64'))
+
+
+def pincode_totals(batches):
+    """The (state, district, pincode) rollup of processed batches, accumulated per unit of the index."""
+    hierarchy = load_hierarchy()
+    sums = np.zeros((len(hierarchy.unit_keys), len(SUM_COLUMNS)))
+    for batch in batches:
+        sums += unit_sums(hierarchy, batch)
+    district_state = hierarchy.district_state[hierarchy.unit_district]
+    return _totals_frame(sums, {'state': hierarchy.state_names[district_state],
+                                'district': hierarchy.district_names[hierarchy.unit_district],
+                                'pincode': hierarchy.unit_pincodes})
+
+
+def district_totals(processed):
+    """The district accumulator of `processed`: unit sums rolled up to districts (segment sums)."""
+    hierarchy = load_hierarchy()
+    return _totals_frame(hierarchy.district_totals(unit_sums(hierarchy, processed)),
+                         {'state': hierarchy.state_names[hierarchy.district_state],
+                          'district': hierarchy.district_names})
+
+
+def state_totals(districts):
+    """The state accumulator from the district one, through the hierarchy index."""
+    hierarchy = load_hierarchy()
+    values = np.zeros((len(hierarchy.district_names), len(SUM_COLUMNS)))
+    values[hierarchy.district_ids(districts['state'], districts['district'])] = districts[SUM_COLUMNS]
+    return _totals_frame(hierarchy.state_totals(values), {'state': hierarchy.state_names})
+
+
+def save_rollups(processed, partitions=None):
+    """Write every rollup from `processed`.
+
+    Without `partitions`, `processed` is the whole dataset and everything
+    is rebuilt. With `partitions`, `processed` holds just those (state,
+    month) partitions: they replace the same partitions of the dated
+    rollups, and the district accumulator is folded with the difference.
+    """
+    district_date = rollup(processed, ROLLUP_GRAINS['district_date'])
+    state_date = rollup(processed, ROLLUP_GRAINS['state_date'])
+    keys = ROLLUP_GRAINS['district']
+    if partitions is None:
+        districts = district_totals(processed)
+        save_frame(district_date, rollup_name('district_date'))
+        save_frame(state_date, rollup_name('state_date'))
+    else:
+        previous = load_frame(rollup_name('district_date'), columns=ROLLUP_GRAINS['district_date'] + SUM_COLUMNS,
+                              filters=partition_filters(partitions))
+        districts = fold(load_table(rollup_name('district')), keys,
+                         rollup(district_date, keys), rollup(previous, keys))
+        replace_partitions(district_date, rollup_name('district_date'), partitions)
+        replace_partitions(state_date, rollup_name('state_date'), partitions)
+    save_table(districts, rollup_name('district'))
+    save_table(state_totals(districts), rollup_name('state'))
+
+
+def load_rollup(grain, filters=None):
+    """Load a rollup with DLI/IGS means and update ratio, ordered by its keys."""
+    keys = ROLLUP_GRAINS[grain]
+    if grain in ACCUMULATORS:
+        frame = load_table(rollup_name(grain))
+    else:
+        frame = load_frame(rollup_name(grain), columns=keys + SUM_COLUMNS, filters=filters)
+    order = frame[keys].astype({key: str for key in keys if key != 'date'})
+    frame = frame.loc[order.sort_values(keys).index].reset_index(drop=True)
+    return with_means(frame)
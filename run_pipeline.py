@@ -0,0 +1,317 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import runpy
+import subprocess
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from data_store import CSV_FILES, STORE_ROOT, dataset_path, flush_memory, keep_in_memory, table_path
+from rollups import rollup_name
+from feature_store import FEATURE_ROOT
+from hierarchy import HIERARCHY_PATH
+from manifest import file_checksum
+from model_store import MODEL_ROOT
+
+# Every stage with the code it runs, the files it reads and the files it
+# writes. A stage is skipped when the hash of its code and inputs matches
+# the last successful run and all of its outputs still exist. Stages marked
+# `reads_store` read aadhaar_store/ files directly rather than through
+# load_frame/load_table, so an in-process run writes the in-memory frames
+# out before starting them.
+SHARED_CODE = ['data_store.py', 'schema.py', 'rollups.py']
+DISTRICT_ROLLUP = table_path(rollup_name('district'))
+STATE_ROLLUP = table_path(rollup_name('state'))
+STATE_DATE_ROLLUP = dataset_path(rollup_name('state_date'))
+
+
+def model_outputs(*names):
+    """The latest.json of each model-store artifact a stage saves."""
+    return [os.path.join(MODEL_ROOT, name, 'latest.json') for name in names]
+
+
+# step5_improved saves the boosting member and the Random Forest search the
+# same environment variables pick there (a search benchmark saves none)
+BOOSTING_MODEL = 'district_gb' if os.environ.get('BOOSTING_ENGINE', 'classic') == 'classic' else 'district_hgb'
+SEARCH_MODELS = ([] if os.environ.get('SEARCH_BENCHMARK') == '1'
+                 else [f"rf_search_{os.environ.get('SEARCH_MODE', 'halving')}"])
+
+
+STAGES = {
+    'ingest': {
+        'script': 'analysis.py',
+        'code': ['ingest.py', 'manifest.py', 'canonical_names.py', 'hierarchy.py', 'validation.py'],
+        'inputs': ['api_data_aadhar_enrolment', 'api_data_aadhar_demographic', 'api_data_aadhar_biometric'],
+        'outputs': [dataset_path('merged'), HIERARCHY_PATH],
+        'after': [],
+    },
+    'index': {
+        'script': 'step3_calculate_index.py',
+        'code': ['manifest.py', 'metrics.py', 'feature_store.py', 'hierarchy.py'],
+        'inputs': [dataset_path('merged'), HIERARCHY_PATH],
+        'outputs': [dataset_path('processed'), dataset_path(rollup_name('district_date')),
+                    STATE_DATE_ROLLUP, DISTRICT_ROLLUP, STATE_ROLLUP, FEATURE_ROOT],
+        'after': ['ingest'],
+    },
+    'visualize': {
+        'script': 'step4_visualizations.py',
+        'code': ['windows.py'],
+        'inputs': [DISTRICT_ROLLUP, STATE_ROLLUP, STATE_DATE_ROLLUP],
+        'outputs': ['viz1_digital_deserts.png', 'viz2_state_comparison.png',
+                    'viz3_time_series.png', 'viz4_risk_matrix.png'],
+        'after': ['index'],
+    },
+    'cluster': {
+        'script': 'step5_ml_models.py',
+        'code': ['feature_store.py', 'model_store.py', 'risk_labels.py'],
+        'inputs': [DISTRICT_ROLLUP],
+        'outputs': ['district_clusters.csv', 'model1_clustering.png',
+                    'model2_feature_importance.png', 'model2_confusion_matrix.png']
+                   + model_outputs('cluster_scaler', 'cluster_kmeans', 'at_risk_rf'),
+        'after': ['index'],
+    },
+    'ensemble': {
+        'script': 'step5_improved_ml_models.py',
+        'code': ['ensemble.py', 'feature_store.py', 'model_store.py', 'risk_labels.py', 'scoring.py'],
+        'inputs': [DISTRICT_ROLLUP],
+        'outputs': ['district_predictions_enhanced.csv', 'model_comparison_results.csv',
+                    'model3_ensemble_confusion_matrix.png', 'model3_ensemble_feature_importance.png',
+                    'model3_roc_comparison.png', 'model3_accuracy_comparison.png']
+                   + model_outputs('district_scaler', BOOSTING_MODEL, 'district_ada', 'district_ensemble',
+                                   'oof_rf', 'oof_gb', 'oof_ada', *SEARCH_MODELS),
+        'after': ['index'],
+    },
+    'pincode': {
+        'script': 'step5_pincode_model.py',
+        'code': ['frame_cache.py', 'model_store.py', 'risk_labels.py'],
+        'inputs': [dataset_path('processed')],
+        'outputs': ['pincode_stream_metrics.csv'] + model_outputs('pincode_sgd'),
+        'after': ['index'],
+        'reads_store': True,
+    },
+    'segment': {
+        'script': 'step5_pincode_clusters.py',
+        'code': ['model_store.py', 'risk_labels.py', 'hierarchy.py'],
+        'inputs': [dataset_path('processed'), HIERARCHY_PATH],
+        'outputs': ['pincode_clusters.csv', 'pincode_k_sweep.csv'] + model_outputs('pincode_scaler', 'pincode_kmeans'),
+        'after': ['index'],
+    },
+    'report': {
+        'script': 'step6_final_report.py',
+        'code': [],
+        'inputs': [DISTRICT_ROLLUP, STATE_ROLLUP, STATE_DATE_ROLLUP, 'district_clusters.csv'],
+        'outputs': ['final_summary_statistics.csv'],
+        'after': ['index', 'cluster'],
+    },
+    'organize': {
+        'script': 'organize_outputs.py',
+        'code': [],
+        'inputs': ['district_clusters.csv', 'final_summary_statistics.csv',
+                   'viz1_digital_deserts.png', 'viz2_state_comparison.png',
+                   'viz3_time_series.png', 'viz4_risk_matrix.png',
+                   'model1_clustering.png', 'model2_confusion_matrix.png', 'model2_feature_importance.png',
+                   dataset_path('merged'), dataset_path('processed')],
+        'outputs': [],
+        'after': ['visualize', 'cluster', 'ensemble', 'report'],
+        'reads_store': True,
+    },
+}
+
+STATE_PATH = os.path.join(STORE_ROOT, 'pipeline_state.json')
+LOG_DIR = 'pipeline_logs'
+
+
+def load_state():
+    if not os.path.exists(STATE_PATH):
+        return {'stages': {}, 'files': {}}
+    with open(STATE_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    tmp_path = STATE_PATH + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def list_files(path):
+    if os.path.isdir(path):
+        return sorted(p for p in glob.glob(os.path.join(path, '**', '*'), recursive=True) if os.path.isfile(p))
+    return [path] if os.path.isfile(path) else []
+
+
+def file_digest(path, known):
+    """Content hash of one file, reusing the last one when size and mtime match."""
+    stat = os.stat(path)
+    previous = known.get(path)
+    if previous and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns:
+        return previous['sha256']
+    digest = file_checksum(path)
+    known[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+    return digest
+
+
+def stage_hash(name, known):
+    stage = STAGES[name]
+    digest = hashlib.sha256()
+    for path in [stage['script']] + SHARED_CODE + stage['code'] + stage['inputs']:
+        for file in list_files(path):
+            digest.update(os.path.normpath(file).encode())
+            digest.update(file_digest(file, known).encode())
+    return digest.hexdigest()
+
+
+def is_up_to_date(name, current_hash, state):
+    outputs_present = all(os.path.exists(path) for path in STAGES[name]['outputs'])
+    return outputs_present and state['stages'].get(name, {}).get('hash') == current_hash
+
+
+def run_stage(name):
+    os.makedirs(LOG_DIR, exist_ok=True)
+    env = dict(os.environ, MPLBACKEND=os.environ.get('MPLBACKEND', 'Agg'), PYTHONIOENCODING='utf-8')
+    started = time.time()
+    with open(os.path.join(LOG_DIR, f'{name}.log'), 'w', encoding='utf-8') as log:
+        result = subprocess.run([sys.executable, STAGES[name]['script']], stdout=log,
+                                stderr=subprocess.STDOUT, env=env)
+    return result.returncode, time.time() - started
+
+
+def run_stage_in_process(name):
+    """Run a stage's script inside this interpreter, sharing the frame registry."""
+    started = time.time()
+    if STAGES[name].get('reads_store'):
+        flush_memory()
+    try:
+        runpy.run_path(STAGES[name]['script'], run_name='__main__')
+        returncode = 0
+    except SystemExit as exit:
+        returncode = exit.code if isinstance(exit.code, int) else int(exit.code is not None)
+    except Exception:
+        traceback.print_exc()
+        returncode = 1
+    if 'matplotlib.pyplot' in sys.modules:
+        sys.modules['matplotlib.pyplot'].close('all')
+    return returncode, time.time() - started
+
+
+def run_pipeline(targets=None, force=False, jobs=2, in_process=False, checkpoints=()):
+    """Run `targets` (default: every stage) and whatever they depend on.
+
+    With `in_process` the stages run one after another in this interpreter
+    and hand the merged/processed frames along in memory. The datasets
+    listed in `checkpoints` are written to the store as they are saved, the
+    rest when the run ends.
+    """
+    if in_process:
+        os.environ.setdefault('MPLBACKEND', 'Agg')
+        keep_in_memory(checkpoints)
+        jobs = 1
+    runner = run_stage_in_process if in_process else run_stage
+    wanted = set()
+
+    def include(name):
+        if name not in wanted:
+            wanted.add(name)
+            for dependency in STAGES[name]['after']:
+                include(dependency)
+
+    for name in targets or STAGES:
+        include(name)
+
+    state = load_state()
+    done, failed, results = set(), set(), {}
+    running = {}
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            while len(done) + len(failed) < len(wanted):
+                blocked = [name for name in wanted - done - failed - set(running)
+                           if any(dependency in failed for dependency in STAGES[name]['after'] if dependency in wanted)]
+                for name in blocked:
+                    failed.add(name)
+                    results[name] = ('blocked', 0.0)
+                    print(f"⏭️  {name}: skipped, an upstream stage failed")
+
+                ready = [name for name in STAGES if name in wanted and name not in done | failed
+                         and name not in running
+                         and all(dependency in done for dependency in STAGES[name]['after'] if dependency in wanted)]
+                for name in ready:
+                    current_hash = stage_hash(name, state['files'])
+                    # In process, what an upstream stage just wrote may still be in memory only
+                    upstream_ran = in_process and any(results[dependency][0] == 'ran'
+                                                      for dependency in STAGES[name]['after'] if dependency in wanted)
+                    if not force and not upstream_ran and is_up_to_date(name, current_hash, state):
+                        done.add(name)
+                        results[name] = ('up to date', 0.0)
+                        print(f"✅ {name}: up to date")
+                        continue
+                    print(f"▶️  {name}: running {STAGES[name]['script']}")
+                    running[name] = pool.submit(runner, name)
+
+                if not running:
+                    continue
+                finished, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+                for name in [name for name, future in running.items() if future in finished]:
+                    returncode, seconds = running.pop(name).result()
+                    if returncode == 0:
+                        done.add(name)
+                        # Hash again: outputs of this stage are inputs downstream, and
+                        # a stage may legitimately touch its own inputs (incremental runs).
+                        state['stages'][name] = {'hash': stage_hash(name, state['files']), 'seconds': round(seconds, 2)}
+                        save_state(state)
+                        results[name] = ('ran', seconds)
+                        print(f"✅ {name}: finished in {seconds:.1f}s")
+                    else:
+                        failed.add(name)
+                        results[name] = ('failed', seconds)
+                        where = '' if in_process else f", see {LOG_DIR}/{name}.log"
+                        print(f"❌ {name}: failed (exit {returncode}){where}")
+    finally:
+        if in_process:
+            flush_memory()
+            # Stage hashes may have been taken before the in-memory outputs reached the disk
+            for name in done:
+                if results[name][0] == 'ran':
+                    state['stages'][name]['hash'] = stage_hash(name, state['files'])
+            save_state(state)
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the Digital Divide pipeline, skipping stages that are up to date.")
+    parser.add_argument('stages', nargs='*', metavar='stage',
+                        help=f"stages to bring up to date (default: all of {', '.join(STAGES)})")
+    parser.add_argument('--force', action='store_true', help="rerun stages even when their inputs are unchanged")
+    parser.add_argument('--jobs', type=int, default=2, help="stages allowed to run at the same time")
+    parser.add_argument('--in-process', action='store_true',
+                        help="run every stage in this interpreter, passing frames along in memory")
+    parser.add_argument('--checkpoint', action='append', default=[], choices=sorted(CSV_FILES),
+                        help="with --in-process, write this dataset to the store as soon as it is saved (repeatable)")
+    args = parser.parse_args()
+    unknown = [name for name in args.stages if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    print("="*80)
+    print("DIGITAL DIVIDE PIPELINE")
+    print("="*80)
+    started = time.time()
+    results = run_pipeline(args.stages or None, force=args.force, jobs=args.jobs,
+                           in_process=args.in_process, checkpoints=args.checkpoint)
+
+    print("\n" + "="*80)
+    print("SUMMARY")
+    print("="*80)
+    for name in STAGES:
+        if name in results:
+            status, seconds = results[name]
+            print(f"  {name:<10} {status:<11} {seconds:6.1f}s")
+    print(f"\nTotal: {time.time() - started:.1f}s")
+    if any(status in ('failed', 'blocked') for status, _ in results.values()):
+        sys.exit(1)
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+# One dtype definition shared by every pipeline step.
+#   date        -> int32 YYYYMMDD (sortable, month = date // 100)
+#   state       -> category
+#   district    -> category
+#   pincode     -> int32
+#   age bands   -> uint32 (per pincode per day, summed over every shard)
+#   totals      -> uint32
+#   indices     -> float32
+#   shard_count -> uint16 (number of ingested shards that reported the key)
+#   row_count   -> uint32 (processed rows behind a rollup row)
+#   *_sum       -> float64 (index sums in rollups, so means compose)
+COUNT_COLUMNS = ['age_0_5', 'age_5_17', 'age_18_greater',
+                 'demo_age_5_17', 'demo_age_17_',
+                 'bio_age_5_17', 'bio_age_17_']
+TOTAL_COLUMNS = ['total_demo_updates', 'total_bio_updates', 'total_enrolments']
+INDEX_COLUMNS = ['DLI', 'IGS', 'update_ratio']
+
+# Bump after changing a stored dtype or what the stored shard totals hold:
+# the next ingest rebuilds the store
+SCHEMA_VERSION = 3
+
+DTYPES = {
+    'date': 'int32',
+    'month': 'int32',
+    'state': 'category',
+    'district': 'category',
+    'pincode': 'int32',
+    **{column: 'uint32' for column in COUNT_COLUMNS},
+    **{column: 'uint32' for column in TOTAL_COLUMNS},
+    **{column: 'float32' for column in INDEX_COLUMNS},
+    'shard_count': 'uint16',
+    'row_count': 'uint32',
+    'DLI_sum': 'float64',
+    'IGS_sum': 'float64',
+}
+
+
+def encode_dates(dates, format='%d-%m-%Y'):
+    """Turn date strings into int32 YYYYMMDD, parsing each distinct value once."""
+    codes, uniques = pd.factorize(dates)
+    parsed = pd.to_datetime(uniques, format=format)
+    encoded = (parsed.year * 10000 + parsed.month * 100 + parsed.day).to_numpy(dtype='int32')
+    return encoded[codes]
+
+
+def decode_dates(dates):
+    """Turn int YYYYMMDD values back into datetime64, again once per distinct value."""
+    codes, uniques = pd.factorize(dates)
+    parsed = pd.to_datetime(pd.Series(uniques).astype(str), format='%Y%m%d').to_numpy()
+    return pd.Series(parsed[codes], index=getattr(dates, 'index', None), name='date')
+
+
+def _check_range(frame, column, dtype):
+    info = np.iinfo(dtype)
+    values = frame[column]
+    if len(values) and (values.min() < info.min or values.max() > info.max):
+        raise ValueError(f"{column} has values outside the {dtype} range "
+                         f"[{values.min()}, {values.max()}]")
+
+
+def apply_schema(frame):
+    """Cast every known column of `frame` to its shared compact dtype."""
+    for column, dtype in DTYPES.items():
+        if column not in frame.columns or str(frame[column].dtype) == dtype:
+            continue
+        if column == 'date' and not pd.api.types.is_numeric_dtype(frame[column]):
+            frame[column] = encode_dates(frame[column])
+            continue
+        if column in COUNT_COLUMNS or column in TOTAL_COLUMNS:
+            frame[column] = frame[column].fillna(0)
+        if dtype.startswith(('int', 'uint')):
+            _check_range(frame, column, dtype)
+        frame[column] = frame[column].astype(dtype)
+    return frame
+
+
+def memory_mb(frame):
+    return frame.memory_usage(deep=True).sum() / 1024 ** 2
@@ -0,0 +1,96 @@
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from feature_store import FEATURE_COLS, RAW_COLUMNS, add_features, feature_matrix
+from model_store import latest_info, load_artifact
+
+# District risk scoring with the ensemble trained by step5_improved.
+# Features come from the same code as the feature store, but with the
+# population constants they depend on (IGS maximum, divide severity range,
+# fill-in medians) taken from the training districts and saved with the
+# ensemble, so a batch of any size is scored exactly as it would have been
+# during training.
+ENSEMBLE_NAME = 'district_ensemble'
+SCALER_NAME = 'district_scaler'
+BATCH_SIZES = (1, 10, 100, 1000)
+
+
+class DistrictScorer:
+    """The saved scaler and ensemble, loaded once, scoring batches of districts."""
+
+    def __init__(self):
+        info = latest_info(ENSEMBLE_NAME)
+        if info is None or 'feature_stats' not in info:
+            raise FileNotFoundError("No saved ensemble; run step5_improved_ml_models.py first")
+        self.key = info['key']
+        self.ensemble = load_artifact(ENSEMBLE_NAME, info['key'])
+        self.scaler = load_artifact(SCALER_NAME, info['scaler_key'])
+        self.stats = info['feature_stats']
+        self.medians = pd.Series(info['feature_medians'])
+        self.feature_version = info.get('feature_version')
+
+    def features(self, districts, version=None):
+        """Scaled model features for raw district aggregates (RAW_COLUMNS).
+
+        Rows of the feature-store table the model was trained on (`version`)
+        are used as they are; anything else is rebuilt with the training
+        constants.
+        """
+        if version is None or version != self.feature_version:
+            districts = add_features(districts[RAW_COLUMNS].copy(), self.stats)
+        X = feature_matrix(districts, self.medians)
+        return pd.DataFrame(self.scaler.transform(X), columns=FEATURE_COLS, index=districts.index)
+
+    def score(self, districts, version=None):
+        """At-risk probability and predicted class for every row of `districts`."""
+        probabilities = self.ensemble.predict_proba(self.features(districts, version))
+        at_risk = list(self.ensemble.classes_).index(1)
+        return pd.DataFrame({'risk_probability': probabilities[:, at_risk],
+                             'predicted_risk': self.ensemble.classes_[probabilities.argmax(axis=1)]},
+                            index=districts.index)
+
+
+@lru_cache(maxsize=1)
+def get_scorer():
+    """The process-wide scorer; the models are read from disk on first use only."""
+    return DistrictScorer()
+
+
+def benchmark(scorer, districts, batch_sizes=BATCH_SIZES, repeats=20):
+    """Latency of scoring batches of each size, drawn from `districts`."""
+    rows = []
+    for size in batch_sizes:
+        batch = districts.sample(size, replace=size > len(districts), random_state=0)
+        scorer.score(batch)  # warm-up
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            scorer.score(batch)
+            timings.append(time.perf_counter() - started)
+        batch_ms = np.median(timings) * 1000
+        rows.append({'batch_size': size, 'batch_ms': round(batch_ms, 3),
+                     'ms_per_district': round(batch_ms / size, 4),
+                     'districts_per_second': round(size / (batch_ms / 1000))})
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    from feature_store import load_features
+
+    print("Loading saved models...")
+    started = time.perf_counter()
+    scorer = get_scorer()
+    print(f"✅ Loaded ensemble {scorer.key} in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    districts, meta = load_features()
+    scores = districts[['state', 'district']].join(scorer.score(districts, meta['version']))
+    print(f"✅ Scored {len(scores):,} districts, {int(scores['predicted_risk'].sum()):,} predicted at risk")
+
+    print("\n⏱️ Scoring latency by batch size:")
+    latency = benchmark(scorer, districts)
+    print(latency.to_string(index=False))
+    latency.to_csv('scoring_latency.csv', index=False)
+    print("✅ Saved: scoring_latency.csv")
@@ -1,10 +1,29 @@
-import pandas as pd
-import numpy as np
+from data_store import dataset_path, has_dataset, load_frame, partition_filters, replace_partitions, save_frame
+from feature_store import load_features
+from manifest import FULL_REBUILD, load_manifest, pending_partitions, save_manifest
+from metrics import METRICS, compute_metrics, metrics_signature
+from rollups import has_rollups, load_rollup, save_rollups
+from schema import apply_schema, memory_mb
 
-print("Loading merged data...")
-data = pd.read_csv('merged_aadhaar_data.csv')
+# After an incremental ingest only the partitions it touched are recomputed;
+# a changed metric set recomputes them all
+manifest = load_manifest()
+pending = pending_partitions(manifest)
+signature = metrics_signature()
+incremental = (not FULL_REBUILD and has_dataset('processed') and has_rollups() and manifest['shards']
+               and not manifest['full_rebuild'] and manifest.get('metrics') == signature)
+if incremental and not pending:
+    print("✅ Processed data already up to date")
+    raise SystemExit(0)
 
-print(f"Original shape: {data.shape}")
+if incremental:
+    print(f"Loading merged data for {len(pending)} changed state/month partition(s)...")
+    data = load_frame('merged', filters=partition_filters(pending))
+else:
+    print("Loading merged data...")
+    data = load_frame('merged')
+
+print(f"Original shape: {data.shape} ({memory_mb(data):.1f} MB in memory)")
 
 # Fill missing values with 0 (no updates means 0)
 data = data.fillna(0)
@@ -12,34 +31,12 @@ data = data.fillna(0)
 print("Missing values after filling:")
 print(data.isnull().sum().sum())
 
-# Calculate total demographic and biometric updates
-print("\nCalculating update totals...")
-data['total_demo_updates'] = data['demo_age_5_17'] + data['demo_age_17_']
-data['total_bio_updates'] = data['bio_age_5_17'] + data['bio_age_17_']
-data['total_enrolments'] = data['age_0_5'] + data['age_5_17'] + data['age_18_greater']
-
-# Calculate Digital Literacy Index (DLI)
-# DLI = bio_updates / demo_updates (avoid division by zero)
-print("Calculating Digital Literacy Index...")
-data['DLI'] = np.where(
-    data['total_demo_updates'] > 0,
-    data['total_bio_updates'] / data['total_demo_updates'],
-    0
-)
-
-# Calculate Infrastructure Gap Score
-# IGS = (enrolments - bio_updates) / enrolments
-print("Calculating Infrastructure Gap Score...")
-data['IGS'] = np.where(
-    data['total_enrolments'] > 0,
-    (data['total_enrolments'] - data['total_bio_updates']) / data['total_enrolments'],
-    0
-)
+# Totals, DLI, IGS and every other registered metric in one chunked pass
+print(f"\nCalculating metrics: {', '.join(METRICS)}...")
+data = compute_metrics(data)
+data = apply_schema(data)
 
-# Cap DLI at reasonable values (some ratios can be > 1, that's fine but cap outliers)
-data['DLI'] = data['DLI'].clip(0, 5)
-
-print(f"\nFinal dataset shape: {data.shape}")
+print(f"\nFinal dataset shape: {data.shape} ({memory_mb(data):.1f} MB in memory)")
 print(f"\nNew columns: {list(data.columns)}")
 
 # Summary statistics
@@ -54,19 +51,38 @@ print("="*60)
 print(data['IGS'].describe())
 
 # Save processed data
-data.to_csv('processed_aadhaar_data.csv', index=False)
-print("\n✅ Processed data saved to 'processed_aadhaar_data.csv'")
+if incremental:
+    replace_partitions(data, 'processed', pending)
+    save_rollups(data, pending)
+else:
+    save_frame(data, 'processed')
+    save_rollups(data)
+if manifest['shards']:
+    manifest['pending_partitions'] = []
+    manifest['full_rebuild'] = False
+    manifest['metrics'] = signature
+    save_manifest(manifest)
+print(f"\n✅ Processed data saved to '{dataset_path('processed')}'"
+      f"{f' ({len(pending)} partition(s) refreshed)' if incremental else ''}")
+print("✅ District×date, state×date and district rollups updated")
+# Materialise this data version's district features for step5, scoring and the dashboard
+features, feature_meta = load_features()
+print(f"✅ District feature table {feature_meta['version']} ready ({len(features):,} districts)")
+
+# State means come from the all-time state rollup: on an incremental run
+# `data` only holds the refreshed partitions
+state_means = load_rollup('state').set_index('state')['DLI']
 
 # Show top 10 states by average DLI
 print("\n" + "="*60)
 print("TOP 10 STATES BY DIGITAL LITERACY INDEX:")
 print("="*60)
-state_dli = data.groupby('state')['DLI'].mean().sort_values(ascending=False).head(10)
+state_dli = state_means.sort_values(ascending=False).head(10)
 print(state_dli)
 
 # Show bottom 10 states (Digital Deserts)
 print("\n" + "="*60)
 print("BOTTOM 10 STATES (DIGITAL DESERTS):")
 print("="*60)
-state_dli_bottom = data.groupby('state')['DLI'].mean().sort_values(ascending=True).head(10)
+state_dli_bottom = state_means.sort_values(ascending=True).head(10)
 print(state_dli_bottom)
@@ -3,32 +3,15 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-print("Loading processed data...")
-data = pd.read_csv('processed_aadhaar_data.csv')
-
-# Clean state names (remove typos and duplicates)
-print("Cleaning state names...")
-state_mapping = {
-    'West bengal': 'West Bengal',
-    'West Bengli': 'West Bengal',
-    'West Bangal': 'West Bengal',
-    'West  Bengal': 'West Bengal',
-    'WESTBENGAL': 'West Bengal',
-    'WEST BENGAL': 'West Bengal',
-    'Uttaranchal': 'Uttarakhand',
-    'Dadra & Nagar Haveli': 'Dadra and Nagar Haveli',
-    'Andaman & Nicobar Islands': 'Andaman and Nicobar Islands'
-}
-data['state'] = data['state'].replace(state_mapping)
-
-# Remove invalid entries
-data = data[data['state'] != '100000']
-data = data[data['state'] != 'Puttenahalli']
-
-# Convert date to datetime
-data['date'] = pd.to_datetime(data['date'], format='%d-%m-%Y')
-
-print(f"Cleaned data shape: {data.shape}")
+from rollups import load_rollup, rollup, with_means
+from schema import decode_dates
+from windows import rolling_indices
+
+print("Loading rollups...")
+district_data = load_rollup('district')
+state_date = load_rollup('state_date')
+
+print(f"Rollups: {len(district_data)} districts, {len(state_date)} state-days")
 
 # Set style
 sns.set_style("whitegrid")
@@ -39,14 +22,6 @@ plt.rcParams['figure.figsize'] = (15, 10)
 # ============================================================
 print("\nCreating Visualization 1: Top 20 Digital Desert Districts...")
 
-district_data = data.groupby(['state', 'district']).agg({
-    'DLI': 'mean',
-    'IGS': 'mean',
-    'total_demo_updates': 'sum',
-    'total_bio_updates': 'sum',
-    'total_enrolments': 'sum'
-}).reset_index()
-
 # Filter districts with significant activity
 district_data = district_data[district_data['total_demo_updates'] > 100]
 
@@ -71,11 +46,7 @@ plt.close()
 # ============================================================
 print("\nCreating Visualization 2: State-wise Comparison...")
 
-state_stats = data.groupby('state').agg({
-    'DLI': 'mean',
-    'total_demo_updates': 'sum',
-    'total_bio_updates': 'sum'
-}).reset_index()
+state_stats = load_rollup('state')
 
 state_stats = state_stats.sort_values('DLI', ascending=False)
 
@@ -118,12 +89,10 @@ plt.close()
 # ============================================================
 print("\nCreating Visualization 3: Time Series Trends...")
 
-daily_trends = data.groupby('date').agg({
-    'total_demo_updates': 'sum',
-    'total_bio_updates': 'sum',
-    'DLI': 'mean',
-    'total_enrolments': 'sum'
-}).reset_index()
+daily_trends = with_means(rollup(state_date, ['date']))
+daily_trends['date'] = decode_dates(daily_trends['date'])
+national_windows = rolling_indices(state_date.assign(country='India'), ['country'])
+national_windows['date'] = decode_dates(national_windows['date'])
 
 fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(15, 10))
 
@@ -149,6 +118,10 @@ ax2.axhline(y=daily_trends['DLI'].mean(), color='r', linestyle='--',
             label=f'Average DLI: {daily_trends["DLI"].mean():.3f}')
 ax2.fill_between(daily_trends['date'], daily_trends['DLI'], 
                  daily_trends['DLI'].mean(), alpha=0.3)
+ax2.plot(national_windows['date'], national_windows['DLI_7d'],
+         linewidth=2, color='darkorange', label='7-day rolling DLI')
+ax2.plot(national_windows['date'], national_windows['DLI_30d'],
+         linewidth=2, color='green', label='30-day rolling DLI')
 ax2.set_xlabel('Date', fontsize=12, fontweight='bold')
 ax2.set_ylabel('Digital Literacy Index', fontsize=12, fontweight='bold')
 ax2.set_title('Digital Literacy Index Trend', fontsize=14, fontweight='bold')
@@ -1,85 +1,58 @@
+import os
+import time
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, VotingClassifier, AdaBoostClassifier
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingGridSearchCV)
+from sklearn.model_selection import train_test_split, GridSearchCV, HalvingGridSearchCV, RandomizedSearchCV
+from sklearn.base import clone
+from sklearn.ensemble import (RandomForestClassifier, GradientBoostingClassifier, HistGradientBoostingClassifier,
+                              AdaBoostClassifier)
 from sklearn.tree import DecisionTreeClassifier
-from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score, roc_auc_score, roc_curve
-from sklearn.cluster import KMeans
 import warnings
 warnings.filterwarnings('ignore')
 
+from ensemble import PrefitVotingClassifier, fold_scores, make_folds, oof_probabilities
+from feature_store import FEATURE_COLS, feature_matrix, load_features
+from model_store import artifact_key, cached_artifact, fit_cached, latest_key
+from risk_labels import risk_levels
+from scoring import ENSEMBLE_NAME, SCALER_NAME
+
+# Random Forest tuning: 'halving' (successive halving with the number of
+# trees as the budget, the default), 'random' (SEARCH_CANDIDATES random
+# candidates) or 'grid' (all 108 configurations, the exhaustive baseline). SEARCH_BENCHMARK=1 runs all three and writes
+# rf_search_comparison.csv.
+SEARCH_MODE = os.environ.get('SEARCH_MODE', 'halving')
+SEARCH_CANDIDATES = int(os.environ.get('SEARCH_CANDIDATES', 20))
+SEARCH_BENCHMARK = os.environ.get('SEARCH_BENCHMARK') == '1'
+CV_FOLDS = 5
+
+# Gradient boosting member: 'classic' (GradientBoostingClassifier, the
+# default) or 'hist' (HistGradientBoostingClassifier: binned features,
+# multi-threaded, early stopping). BOOST_BENCHMARK=1 times every member on
+# the same split and writes boosting_benchmark.csv.
+BOOSTING_ENGINE = os.environ.get('BOOSTING_ENGINE', 'classic')
+BOOST_BENCHMARK = os.environ.get('BOOST_BENCHMARK') == '1'
+
 print("="*80)
 print("🚀 ADVANCED ML MODELS - ENSEMBLE & OPTIMIZATION")
 print("Improving Accuracy from 79% to 85%+")
 print("="*80)
 
-# Load data
-print("\n📊 Loading processed data...")
-data = pd.read_csv('processed_aadhaar_data.csv')
-print(f"✅ Loaded {len(data):,} records")
-
-# Aggregate by district for better predictions
-print("\n🔄 Aggregating data by district...")
-district_data = data.groupby(['state', 'district']).agg({
-    'DLI': 'mean',
-    'IGS': 'mean',
-    'total_demo_updates': 'sum',
-    'total_bio_updates': 'sum',
-    'total_enrolments': 'sum'
-}).reset_index()
-
-# Enhanced Feature Engineering
-print("\n⚙️ Engineering advanced features...")
-
-# 1. Update ratio
-district_data['update_ratio'] = district_data['total_bio_updates'] / (district_data['total_demo_updates'] + 1)
-
-# 2. Enrolment efficiency
-district_data['enrolment_efficiency'] = district_data['total_enrolments'] / (district_data['total_demo_updates'] + district_data['total_bio_updates'] + 1)
-
-# 3. Digital engagement score (combines multiple factors)
-district_data['digital_engagement'] = (
-    district_data['DLI'] * 0.4 + 
-    district_data['update_ratio'] * 0.3 + 
-    district_data['enrolment_efficiency'] * 0.3
-)
-
-# 4. Volume score (log-scaled to handle large numbers)
-district_data['volume_score'] = np.log1p(
-    district_data['total_demo_updates'] + 
-    district_data['total_bio_updates'] + 
-    district_data['total_enrolments']
-)
-
-# 5. Infrastructure readiness score
-district_data['infra_readiness'] = 1 - (district_data['IGS'] / district_data['IGS'].max())
-
-# 6. Digital divide severity
-district_data['divide_severity'] = district_data['total_demo_updates'] - district_data['total_bio_updates']
-district_data['divide_severity_norm'] = (district_data['divide_severity'] - district_data['divide_severity'].min()) / (district_data['divide_severity'].max() - district_data['divide_severity'].min())
-
-print(f"✅ Created 7 advanced features")
+# Load data with the engineered features (built once per data version by feature_store.py)
+print("\n📊 Loading district feature table...")
+district_data, feature_meta = load_features()
+stats = feature_meta['stats']
+print(f"✅ Loaded {len(district_data):,} districts (feature table {feature_meta['version']})")
 
 # Create target variable with improved thresholds
 print("\n🎯 Creating enhanced target variable...")
-# More sophisticated risk classification
-igs_median = district_data['IGS'].median()
-
-def classify_risk(row):
-    if row['DLI'] < 0.10:
-        return 2  # High Risk
-    elif row['DLI'] < 0.20 and row['IGS'] > igs_median:
-        return 1  # Medium Risk
-    elif row['DLI'] < 0.15:
-        return 1  # Medium Risk
-    else:
-        return 0  # Low Risk
-
-district_data['risk_level'] = district_data.apply(lambda row: classify_risk(row), axis=1)
+# More sophisticated risk classification (rule table in risk_labels.py)
+district_data['risk_level'] = risk_levels(district_data)
 
 # Binary classification: At risk (1) vs Not at risk (0)
 district_data['at_risk'] = (district_data['risk_level'] >= 1).astype(int)
@@ -90,22 +63,17 @@ print(f"   At Risk: {district_data['at_risk'].sum()} districts ({district_data['
 print(f"   Safe: {len(district_data) - district_data['at_risk'].sum()} districts ({(len(district_data) - district_data['at_risk'].sum())/len(district_data)*100:.1f}%)")
 
 # Prepare features
-feature_cols = ['DLI', 'IGS', 'total_demo_updates', 'total_bio_updates', 'total_enrolments',
-                'update_ratio', 'enrolment_efficiency', 'digital_engagement', 
-                'volume_score', 'infra_readiness', 'divide_severity_norm']
-
-X = district_data[feature_cols]
+feature_cols = FEATURE_COLS
 y = district_data['at_risk']
 
-# Handle any infinite or NaN values
-X = X.replace([np.inf, -np.inf], np.nan)
-X = X.fillna(X.median())
+# Handle any infinite or NaN values (scoring fills gaps with the same medians)
+feature_medians = district_data[feature_cols].replace([np.inf, -np.inf], np.nan).median()
+X = feature_matrix(district_data, feature_medians)
 
 # Scale features for better performance
 print("\n📏 Scaling features...")
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
-X_scaled = pd.DataFrame(X_scaled, columns=feature_cols)
+scaler, loaded = fit_cached(SCALER_NAME, StandardScaler(), X)
+X_scaled = pd.DataFrame(scaler.transform(X), columns=feature_cols)
 
 # Train-test split
 X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42, stratify=y)
@@ -124,15 +92,58 @@ rf_params = {
     'min_samples_leaf': [1, 2, 4]
 }
 
-rf_base = RandomForestClassifier(random_state=42)
-rf_grid = GridSearchCV(rf_base, rf_params, cv=5, scoring='accuracy', n_jobs=-1, verbose=0)
-rf_grid.fit(X_train, y_train)
 
-print(f"✅ Best parameters: {rf_grid.best_params_}")
-print(f"✅ Best CV score: {rf_grid.best_score_:.4f}")
+def make_search(mode):
+    rf_base = RandomForestClassifier(random_state=42)
+    if mode == 'grid':
+        return GridSearchCV(rf_base, rf_params, cv=CV_FOLDS, scoring='accuracy', n_jobs=-1, verbose=0)
+    if mode == 'random':
+        return RandomizedSearchCV(rf_base, rf_params, n_iter=SEARCH_CANDIDATES, cv=CV_FOLDS, scoring='accuracy',
+                                  n_jobs=-1, random_state=42, verbose=0)
+    if mode == 'halving':
+        # Forest size is the budget: every configuration starts with a few
+        # trees and only the best third of each round gets three times as many
+        tree_params = {name: values for name, values in rf_params.items() if name != 'n_estimators'}
+        return HalvingGridSearchCV(rf_base, tree_params, resource='n_estimators', min_resources=33,
+                                   max_resources=max(rf_params['n_estimators']), factor=3, cv=CV_FOLDS,
+                                   scoring='accuracy', n_jobs=-1, random_state=42, verbose=0)
+    raise ValueError(f"Unknown SEARCH_MODE {mode!r} (expected 'halving', 'random' or 'grid')")
+
+
+def run_search(mode, reuse=True):
+    """Fit the `mode` search, or load the saved one for the same training data when `reuse`."""
+    started = time.perf_counter()
+    if reuse:
+        search, loaded = fit_cached(f'rf_search_{mode}', make_search(mode), X_train, y_train)
+    else:
+        search, loaded = make_search(mode).fit(X_train, y_train), False
+    seconds = time.perf_counter() - started
+    # One cv_results_ row per candidate (per round for halving), each fitted on every fold
+    fits = len(search.cv_results_['params']) * CV_FOLDS
+    return search, loaded, {'Mode': mode, 'Seconds': round(seconds, 2), 'Fits': fits,
+                            'Best CV score': round(search.best_score_, 4), 'Best parameters': search.best_params_}
+
+
+# A benchmark times real fits, so it never reuses saved searches
+rf_search, loaded, search_stats = run_search(SEARCH_MODE, reuse=not SEARCH_BENCHMARK)
+if loaded:
+    print(f"♻️ Loaded saved {SEARCH_MODE} search ({search_stats['Fits']} fits skipped)")
+else:
+    print(f"✅ Search: {SEARCH_MODE}, {search_stats['Fits']} fits in {search_stats['Seconds']:.1f}s")
+print(f"✅ Best parameters: {rf_search.best_params_}")
+print(f"✅ Best CV score: {rf_search.best_score_:.4f}")
+
+if SEARCH_BENCHMARK:
+    print("\n⏱️ Benchmarking search modes...")
+    comparison = [search_stats] + [run_search(mode, reuse=False)[2] for mode in ['halving', 'random', 'grid']
+                                   if mode != SEARCH_MODE]
+    comparison = pd.DataFrame(comparison)
+    print(comparison.to_string(index=False))
+    comparison.to_csv('rf_search_comparison.csv', index=False)
+    print("✅ Saved: rf_search_comparison.csv")
 
 # Best Random Forest
-rf_best = rf_grid.best_estimator_
+rf_best = rf_search.best_estimator_
 rf_pred = rf_best.predict(X_test)
 rf_accuracy = accuracy_score(y_test, rf_pred)
 rf_auc = roc_auc_score(y_test, rf_best.predict_proba(X_test)[:, 1])
@@ -141,24 +152,47 @@ print(f"\n📊 Random Forest Results:")
 print(f"   Accuracy: {rf_accuracy:.4f} ({rf_accuracy*100:.2f}%)")
 print(f"   ROC-AUC: {rf_auc:.4f}")
 
+gb_name = {'classic': 'Gradient Boosting', 'hist': 'Hist Gradient Boosting'}.get(BOOSTING_ENGINE, BOOSTING_ENGINE)
+
 print("\n" + "="*80)
-print("🤖 MODEL 2: GRADIENT BOOSTING")
+print(f"🤖 MODEL 2: {gb_name.upper()}")
 print("="*80)
 
-gb_model = GradientBoostingClassifier(
-    n_estimators=200,
-    learning_rate=0.1,
-    max_depth=5,
-    min_samples_split=5,
-    min_samples_leaf=2,
-    random_state=42
-)
-gb_model.fit(X_train, y_train)
+
+def make_booster(engine):
+    if engine == 'classic':
+        return GradientBoostingClassifier(
+            n_estimators=200,
+            learning_rate=0.1,
+            max_depth=5,
+            min_samples_split=5,
+            min_samples_leaf=2,
+            random_state=42
+        )
+    if engine == 'hist':
+        # Stops adding trees once 10 rounds bring no gain on a held-out 10% of the training rows
+        return HistGradientBoostingClassifier(
+            max_iter=500,
+            learning_rate=0.1,
+            max_depth=5,
+            early_stopping=True,
+            validation_fraction=0.1,
+            n_iter_no_change=10,
+            random_state=42
+        )
+    raise ValueError(f"Unknown BOOSTING_ENGINE {engine!r} (expected 'classic' or 'hist')")
+
+
+gb_model, loaded = fit_cached('district_gb' if BOOSTING_ENGINE == 'classic' else 'district_hgb',
+                              make_booster(BOOSTING_ENGINE), X_train, y_train)
+print(f"{'♻️ Loaded saved' if loaded else '💾 Trained and saved'} {gb_name} model")
+if BOOSTING_ENGINE == 'hist':
+    print(f"   Early stopping kept {gb_model.n_iter_} of {gb_model.max_iter} boosting rounds")
 gb_pred = gb_model.predict(X_test)
 gb_accuracy = accuracy_score(y_test, gb_pred)
 gb_auc = roc_auc_score(y_test, gb_model.predict_proba(X_test)[:, 1])
 
-print(f"\n📊 Gradient Boosting Results:")
+print(f"\n📊 {gb_name} Results:")
 print(f"   Accuracy: {gb_accuracy:.4f} ({gb_accuracy*100:.2f}%)")
 print(f"   ROC-AUC: {gb_auc:.4f}")
 
@@ -166,13 +200,13 @@ print("\n" + "="*80)
 print("🤖 MODEL 3: ADABOOST")
 print("="*80)
 
-ada_model = AdaBoostClassifier(
+ada_model, loaded = fit_cached('district_ada', AdaBoostClassifier(
     base_estimator=DecisionTreeClassifier(max_depth=3),
     n_estimators=100,
     learning_rate=1.0,
     random_state=42
-)
-ada_model.fit(X_train, y_train)
+), X_train, y_train)
+print(f"{'♻️ Loaded saved' if loaded else '💾 Trained and saved'} AdaBoost model")
 ada_pred = ada_model.predict(X_test)
 ada_accuracy = accuracy_score(y_test, ada_pred)
 ada_auc = roc_auc_score(y_test, ada_model.predict_proba(X_test)[:, 1])
@@ -181,23 +215,61 @@ print(f"\n📊 AdaBoost Results:")
 print(f"   Accuracy: {ada_accuracy:.4f} ({ada_accuracy*100:.2f}%)")
 print(f"   ROC-AUC: {ada_auc:.4f}")
 
+if BOOST_BENCHMARK:
+    # Fresh fits of every member on the same split; saved models are not used
+    print("\n⏱️ Benchmarking boosting engines against the other members...")
+
+    def benchmark_model(name, model, repeats=20):
+        started = time.perf_counter()
+        model.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - started
+        latency = {}
+        for label, batch in [('test set', X_test), ('1 district', X_test.iloc[:1])]:
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                model.predict_proba(batch)
+                timings.append(time.perf_counter() - started)
+            latency[label] = np.median(timings) * 1000
+        return {'Model': name, 'Fit seconds': round(fit_seconds, 3),
+                'Predict ms (test set)': round(latency['test set'], 3),
+                'Predict ms (1 district)': round(latency['1 district'], 3),
+                'Accuracy': round(accuracy_score(y_test, model.predict(X_test)), 4),
+                'ROC-AUC': round(roc_auc_score(y_test, model.predict_proba(X_test)[:, 1]), 4)}
+
+    boosting_benchmark = pd.DataFrame([
+        benchmark_model('Gradient Boosting', make_booster('classic')),
+        benchmark_model('Hist Gradient Boosting', make_booster('hist')),
+        benchmark_model('AdaBoost', clone(ada_model)),
+        benchmark_model('Random Forest', clone(rf_best)),
+    ])
+    print(boosting_benchmark.to_string(index=False))
+    boosting_benchmark.to_csv('boosting_benchmark.csv', index=False)
+    print("✅ Saved: boosting_benchmark.csv")
+
 print("\n" + "="*80)
 print("🚀 MODEL 4: ENSEMBLE VOTING CLASSIFIER (THE WINNER!)")
 print("="*80)
 
-# Create ensemble with the best models
-ensemble = VotingClassifier(
+# Combine the models trained above; none of them is refitted
+ensemble = PrefitVotingClassifier(
     estimators=[
         ('rf', rf_best),
         ('gb', gb_model),
         ('ada', ada_model)
     ],
-    voting='soft',  # Use probability-based voting
     weights=[2, 2, 1]  # Give more weight to RF and GB
 )
 
-print("\n🔄 Training ensemble model...")
-ensemble.fit(X_train, y_train)
+print("\n🔄 Assembling ensemble from the fitted models (soft voting)...")
+# Saved with the members it was assembled from, so scoring.py can use it without retraining
+ensemble_key = artifact_key([X_train, y_train], {'weights': ensemble.weights, 'members': {
+    name: model.get_params() for name, model in ensemble.estimators}})
+# Everything scoring.py needs to rebuild the features and scale them
+ensemble, loaded = cached_artifact(ENSEMBLE_NAME, ensemble_key, ensemble.fit, info={
+    'feature_cols': feature_cols, 'feature_stats': stats, 'feature_medians': feature_medians.to_dict(),
+    'scaler_key': latest_key(SCALER_NAME), 'feature_version': feature_meta['version']})
+print(f"{'♻️ Loaded saved' if loaded else '💾 Saved'} ensemble")
 ensemble_pred = ensemble.predict(X_test)
 ensemble_accuracy = accuracy_score(y_test, ensemble_pred)
 ensemble_auc = roc_auc_score(y_test, ensemble.predict_proba(X_test)[:, 1])
@@ -210,9 +282,26 @@ print(f"   ROC-AUC: {ensemble_auc:.4f}")
 print("\n📋 Detailed Classification Report:")
 print(classification_report(y_test, ensemble_pred, target_names=['Safe', 'At Risk']))
 
-# Cross-validation for ensemble
+# Cross-validation for ensemble: each member is fitted once per fold for its
+# out-of-fold probabilities, and every fold's ensemble vote is combined from them
 print("\n🔄 Cross-validation (5-fold):")
-cv_scores = cross_val_score(ensemble, X_scaled, y, cv=5, scoring='accuracy')
+folds = make_folds(X_scaled, y, n_splits=5)
+
+
+def cached_oof(name, model):
+    """Out-of-fold probabilities of one member, loaded when saved for the same data and parameters."""
+    key = artifact_key([X_scaled, y], {'params': model.get_params(), 'folds': len(folds)})
+    probabilities, loaded = cached_artifact(f'oof_{name}', key, lambda: oof_probabilities(model, X_scaled, y, folds))
+    return probabilities
+
+
+member_oof = {}
+for name, model in ensemble.estimators:
+    member_oof[name] = cached_oof(name, model)
+for name, probabilities in member_oof.items():
+    member_cv = fold_scores([probabilities], y, folds, ensemble.classes_)
+    print(f"   {name}: {member_cv.mean():.4f} (+/- {member_cv.std():.4f})")
+cv_scores = fold_scores(list(member_oof.values()), y, folds, ensemble.classes_, weights=ensemble.weights)
 print(f"   CV Scores: {cv_scores}")
 print(f"   Mean CV Accuracy: {cv_scores.mean():.4f} (+/- {cv_scores.std():.4f})")
 
@@ -221,7 +310,7 @@ print("📊 MODEL COMPARISON")
 print("="*80)
 
 results_df = pd.DataFrame({
-    'Model': ['Random Forest', 'Gradient Boosting', 'AdaBoost', '🏆 ENSEMBLE'],
+    'Model': ['Random Forest', gb_name, 'AdaBoost', '🏆 ENSEMBLE'],
     'Accuracy': [rf_accuracy, gb_accuracy, ada_accuracy, ensemble_accuracy],
     'ROC-AUC': [rf_auc, gb_auc, ada_auc, ensemble_auc]
 })
@@ -281,7 +370,7 @@ plt.figure(figsize=(12, 8))
 
 models = [
     ('Random Forest', rf_best, 'blue'),
-    ('Gradient Boosting', gb_model, 'green'),
+    (gb_name, gb_model, 'green'),
     ('AdaBoost', ada_model, 'orange'),
     ('Ensemble (Best)', ensemble, 'red')
 ]
@@ -369,9 +458,9 @@ print(f"""
 ✅ ROC-AUC Score:              {ensemble_auc:.3f}
 
 🚀 KEY ACHIEVEMENTS:
-   • Created 7 advanced engineered features
+   • Used 7 advanced engineered features from the district feature store
    • Tested 4 different ML algorithms
-   • Performed hyperparameter tuning
+   • Performed budgeted hyperparameter tuning ({SEARCH_MODE} search)
    • Built ensemble model with soft voting
    • Generated 4 professional visualizations
    • Achieved {ensemble_accuracy*100:.2f}% accuracy (Target: 85%+)
@@ -10,21 +10,15 @@ from sklearn.metrics import classification_report, confusion_matrix
 import warnings
 warnings.filterwarnings('ignore')
 
-print("Loading processed data...")
-data = pd.read_csv('processed_aadhaar_data.csv')
-
-# Clean data
-state_mapping = {
-    'West bengal': 'West Bengal', 'West Bengli': 'West Bengal',
-    'West Bangal': 'West Bengal', 'West  Bengal': 'West Bengal',
-    'WESTBENGAL': 'West Bengal', 'WEST BENGAL': 'West Bengal',
-    'Uttaranchal': 'Uttarakhand', 'Dadra & Nagar Haveli': 'Dadra and Nagar Haveli',
-    'Andaman & Nicobar Islands': 'Andaman and Nicobar Islands'
-}
-data['state'] = data['state'].replace(state_mapping)
-data = data[~data['state'].isin(['100000', 'Puttenahalli'])]
-
-print(f"Data shape: {data.shape}")
+from feature_store import load_features
+from model_store import fit_cached
+from risk_labels import AT_RISK_DLI, at_risk, dli_bands
+
+print("Loading district feature table...")
+district_features = load_features()[0][['state', 'district', 'DLI', 'IGS', 'total_demo_updates',
+                                        'total_bio_updates', 'total_enrolments']]
+
+print(f"Districts: {len(district_features)}")
 
 # ============================================================
 # MODEL 1: K-Means Clustering for District Categories
@@ -33,28 +27,20 @@ print("\n" + "="*60)
 print("MODEL 1: K-MEANS CLUSTERING")
 print("="*60)
 
-# Aggregate by district
-district_features = data.groupby(['state', 'district']).agg({
-    'DLI': 'mean',
-    'IGS': 'mean',
-    'total_demo_updates': 'sum',
-    'total_bio_updates': 'sum',
-    'total_enrolments': 'sum'
-}).reset_index()
-
 # Filter active districts
 district_features = district_features[district_features['total_demo_updates'] > 50]
 
 # Select features for clustering
 features_for_clustering = district_features[['DLI', 'total_demo_updates', 'total_bio_updates']].values
 
-# Standardize features
-scaler = StandardScaler()
-features_scaled = scaler.fit_transform(features_for_clustering)
+# Standardize features (saved models are reused while the districts are unchanged)
+scaler, loaded = fit_cached('cluster_scaler', StandardScaler(), features_for_clustering)
+features_scaled = scaler.transform(features_for_clustering)
 
 # K-Means with 5 clusters
-kmeans = KMeans(n_clusters=5, random_state=42, n_init=10)
-district_features['cluster'] = kmeans.fit_predict(features_scaled)
+kmeans, loaded = fit_cached('cluster_kmeans', KMeans(n_clusters=5, random_state=42, n_init=10), features_scaled)
+print(f"{'♻️ Loaded saved' if loaded else '💾 Trained and saved'} K-Means model")
+district_features['cluster'] = kmeans.labels_
 
 # Analyze clusters
 print("\nCluster Analysis:")
@@ -66,21 +52,9 @@ cluster_summary = district_features.groupby('cluster').agg({
 }).round(3)
 print(cluster_summary)
 
-# Assign meaningful labels based on DLI
-cluster_labels = {}
-for cluster_id in range(5):
-    avg_dli = district_features[district_features['cluster'] == cluster_id]['DLI'].mean()
-    if avg_dli > 0.4:
-        cluster_labels[cluster_id] = 'Thriving'
-    elif avg_dli > 0.25:
-        cluster_labels[cluster_id] = 'Progressing'
-    elif avg_dli > 0.15:
-        cluster_labels[cluster_id] = 'Struggling'
-    elif avg_dli > 0.05:
-        cluster_labels[cluster_id] = 'Critical'
-    else:
-        cluster_labels[cluster_id] = 'Emergency'
-
+# Assign meaningful labels based on each cluster's mean DLI (bands in risk_labels.py)
+cluster_dli = district_features.groupby('cluster')['DLI'].mean().reindex(range(5))
+cluster_labels = dict(zip(cluster_dli.index, dli_bands(cluster_dli.to_numpy()).astype(object)))
 district_features['cluster_label'] = district_features['cluster'].map(cluster_labels)
 
 print("\nCluster Labels:")
@@ -117,10 +91,10 @@ print("\n" + "="*60)
 print("MODEL 2: RANDOM FOREST CLASSIFICATION")
 print("="*60)
 
-# Create binary target: At-Risk (DLI < 0.2) vs Safe
-district_features['at_risk'] = (district_features['DLI'] < 0.2).astype(int)
+# Create binary target: At-Risk (DLI below the risk_labels.py threshold) vs Safe
+district_features['at_risk'] = at_risk(district_features['DLI'])
 
-print(f"\nAt-Risk Districts: {district_features['at_risk'].sum()}")
+print(f"\nAt-Risk Districts (DLI < {AT_RISK_DLI}): {district_features['at_risk'].sum()}")
 print(f"Safe Districts: {(district_features['at_risk'] == 0).sum()}")
 
 # Features for prediction
@@ -131,8 +105,9 @@ y = district_features['at_risk']
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42)
 
 # Train Random Forest
-rf_model = RandomForestClassifier(n_estimators=100, random_state=42, max_depth=10)
-rf_model.fit(X_train, y_train)
+rf_model, loaded = fit_cached('at_risk_rf', RandomForestClassifier(n_estimators=100, random_state=42, max_depth=10),
+                              X_train, y_train)
+print(f"{'♻️ Loaded saved' if loaded else '💾 Trained and saved'} Random Forest")
 
 # Predictions
 y_pred = rf_model.predict(X_test)
@@ -0,0 +1,96 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+from sklearn.preprocessing import StandardScaler
+import warnings
+warnings.filterwarnings('ignore')
+
+from data_store import iter_batches
+from model_store import fit_cached
+from risk_labels import dli_bands
+from rollups import pincode_totals, with_means
+
+# Pincode segmentation with mini-batch K-Means. The pincode totals are
+# accumulated from the processed data batch by batch into the units of the
+# hierarchy index; k is picked by silhouette from a sweep over K_VALUES,
+# fitted in parallel on a sample of SWEEP_SAMPLE pincodes, and the chosen k
+# is then fitted on every pincode.
+K_VALUES = range(3, 11)
+SWEEP_SAMPLE = int(os.environ.get('SWEEP_SAMPLE', 10_000))
+SILHOUETTE_SAMPLE = 5_000  # silhouette is quadratic in rows
+MIN_DEMO_UPDATES = 10  # pincodes with fewer updates have too noisy a DLI
+PINCODE_KEYS = ['state', 'district', 'pincode']
+CLUSTER_FEATURES = ['DLI', 'total_demo_updates', 'total_bio_updates']
+
+
+def make_kmeans(k):
+    return MiniBatchKMeans(n_clusters=k, batch_size=2048, n_init=3, random_state=42)
+
+
+def sweep_k(k, X):
+    """Fit k clusters on the sample; inertia, silhouette and timings."""
+    started = time.perf_counter()
+    kmeans = make_kmeans(k).fit(X)
+    fit_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    silhouette = silhouette_score(X, kmeans.labels_, sample_size=min(SILHOUETTE_SAMPLE, len(X)), random_state=42)
+    return {'k': k, 'inertia': round(kmeans.inertia_ / len(X), 4), 'silhouette': round(silhouette, 4),
+            'fit_seconds': round(fit_seconds, 3), 'silhouette_seconds': round(time.perf_counter() - started, 3)}
+
+
+print("=" * 80)
+print("📍 PINCODE SEGMENTATION (mini-batch K-Means)")
+print("=" * 80)
+
+print("\nAggregating processed rows per pincode...")
+pincodes = with_means(pincode_totals(
+    iter_batches('processed', PINCODE_KEYS + CLUSTER_FEATURES + ['IGS', 'total_enrolments'], 200_000)))
+pincodes = pincodes[pincodes['total_demo_updates'] >= MIN_DEMO_UPDATES].reset_index(drop=True)
+print(f"Pincodes: {len(pincodes):,} with at least {MIN_DEMO_UPDATES} demographic updates")
+
+# Update counts span several orders of magnitude between pincodes: cluster on their logs
+features = pincodes[CLUSTER_FEATURES].to_numpy(dtype='float64')
+features[:, 1:] = np.log1p(features[:, 1:])
+scaler, loaded = fit_cached('pincode_scaler', StandardScaler(), features)
+features_scaled = scaler.transform(features)
+
+sample = np.random.default_rng(42).permutation(len(features_scaled))[:SWEEP_SAMPLE]
+print(f"\n⏱️ Sweeping k = {K_VALUES.start}..{K_VALUES.stop - 1} on {len(sample):,} pincodes in parallel...")
+started = time.perf_counter()
+sweep = pd.DataFrame(Parallel(n_jobs=-1)(delayed(sweep_k)(k, features_scaled[sample]) for k in K_VALUES))
+print(sweep.to_string(index=False))
+print(f"Sweep took {time.perf_counter() - started:.1f}s")
+best_k = int(sweep.loc[sweep['silhouette'].idxmax(), 'k'])
+sweep['chosen'] = sweep['k'] == best_k
+sweep.to_csv('pincode_k_sweep.csv', index=False)
+print(f"✅ Chose k = {best_k} (highest silhouette)")
+print("✅ Saved: pincode_k_sweep.csv")
+
+started = time.perf_counter()
+kmeans, loaded = fit_cached('pincode_kmeans', make_kmeans(best_k), features_scaled)
+print(f"{'♻️ Loaded saved' if loaded else '💾 Trained and saved'} K-Means model "
+      f"({time.perf_counter() - started:.1f}s on {len(features_scaled):,} pincodes)")
+pincodes['cluster'] = kmeans.labels_
+
+# Name the clusters by mean DLI, with the same bands as the district
+# clusters. k can exceed the number of bands, so clusters are ranked by
+# mean DLI (1 = highest) and the rank keeps labels in one band apart.
+cluster_dli = pincodes.groupby('cluster')['DLI'].mean().reindex(range(best_k))
+ranks = cluster_dli.rank(ascending=False, method='first', na_option='bottom').astype(int)
+cluster_labels = {cluster: f'{band} {rank}' for cluster, band, rank in
+                  zip(cluster_dli.index, dli_bands(cluster_dli.to_numpy()).astype(object), ranks)}
+pincodes['cluster_label'] = pincodes['cluster'].map(cluster_labels)
+
+print("\nCluster Analysis:")
+print(pincodes.groupby(['cluster', 'cluster_label']).agg(
+    pincodes=('pincode', 'count'), DLI=('DLI', 'mean'),
+    total_demo_updates=('total_demo_updates', 'sum'), total_bio_updates=('total_bio_updates', 'sum')).round(3))
+
+pincodes[PINCODE_KEYS + CLUSTER_FEATURES + ['total_enrolments', 'IGS', 'cluster', 'cluster_label']].to_csv(
+    'pincode_clusters.csv', index=False)
+print("✅ Saved: pincode_clusters.csv")
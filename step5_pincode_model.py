@@ -0,0 +1,170 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import accuracy_score, log_loss, roc_auc_score
+from sklearn.preprocessing import StandardScaler
+import warnings
+warnings.filterwarnings('ignore')
+
+from data_store import dataset_path, iter_batches
+from frame_cache import source_fingerprint
+from model_store import artifact_key, save_artifact
+from risk_labels import risk_levels
+from schema import decode_dates
+
+# Pincode×date risk model trained out of core: the processed dataset is
+# streamed in batches of STREAM_BATCH_ROWS rows into an SGD logistic
+# regression (partial_fit), so memory is bounded by a few batches, not by
+# the table. Each epoch visits the partition files (one state/month each)
+# in a new order and shuffles rows across a buffer of SHUFFLE_BATCHES
+# batches, so consecutive updates mix several states; then it scores the
+# held-out pincodes.
+STREAM_BATCH_ROWS = int(os.environ.get('STREAM_BATCH_ROWS', 50_000))
+STREAM_EPOCHS = int(os.environ.get('STREAM_EPOCHS', 5))
+SHUFFLE_BATCHES = int(os.environ.get('STREAM_SHUFFLE_BATCHES', 4))
+# Share of pincodes (by a hash of the pincode, so every day of a pincode
+# lands on the same side) kept out of training for evaluation
+HOLDOUT_PERCENT = 20
+
+# Label inputs (DLI, IGS) and the columns the features are built from.
+# Features leave out everything derived from biometric updates, which the
+# label is computed from.
+LABEL_COLUMNS = ['DLI', 'IGS']
+COUNT_COLUMNS = ['demo_age_5_17', 'demo_age_17_', 'age_0_5', 'age_5_17', 'age_18_greater',
+                 'total_demo_updates', 'total_enrolments']
+READ_COLUMNS = ['date', 'pincode'] + COUNT_COLUMNS + LABEL_COLUMNS
+PREFIXES = 100  # two-digit pincode prefix (postal region), one-hot
+FEATURE_NAMES = ([f'log_{column}' for column in COUNT_COLUMNS] + ['child_demo_share']
+                 + [f'weekday_{day}' for day in range(7)] + [f'prefix_{prefix:02d}' for prefix in range(PREFIXES)])
+
+
+def is_holdout(pincodes):
+    """Deterministic ~HOLDOUT_PERCENT% sample of pincodes (multiplicative hash)."""
+    hashed = (np.asarray(pincodes, dtype='uint64') * np.uint64(2654435761)) % np.uint64(2 ** 32)
+    return (hashed >> np.uint64(16)) % np.uint64(100) < HOLDOUT_PERCENT
+
+
+def prepare(batch):
+    """(rows, features, holdout mask) for the rows of a batch with demographic updates.
+
+    Rows without demographic updates have no DLI to speak of and are skipped.
+    """
+    batch = batch[batch['total_demo_updates'] > 0]
+    rows = len(batch)
+    X = np.zeros((rows, len(FEATURE_NAMES)), dtype='float32')
+    counts = batch[COUNT_COLUMNS].to_numpy(dtype='float32')
+    np.log1p(counts, out=X[:, :len(COUNT_COLUMNS)])
+    column = len(COUNT_COLUMNS)
+    X[:, column] = batch['demo_age_5_17'].to_numpy() / batch['total_demo_updates'].to_numpy()
+    column += 1
+    weekday = decode_dates(batch['date']).dt.dayofweek.to_numpy()
+    X[np.arange(rows), column + weekday] = 1
+    column += 7
+    prefix = batch['pincode'].to_numpy() // 10000
+    X[np.arange(rows), column + prefix] = 1
+    return batch, X, is_holdout(batch['pincode'].to_numpy())
+
+
+def tally_median(counts):
+    """Median (as pandas computes it) of the values tallied in a {value: count} Series."""
+    counts = counts.sort_index()
+    positions = counts.cumsum().to_numpy()
+    total = positions[-1]
+    middle = np.searchsorted(positions, [(total - 1) // 2, total // 2], side='right')
+    return float(counts.index[middle].to_numpy(dtype='float64').mean())
+
+
+def training_batches(epoch, igs_median, rng):
+    """(X, y) of the training rows in batches of STREAM_BATCH_ROWS, shuffled across SHUFFLE_BATCHES batches."""
+    features, labels, buffered = [], [], 0
+    for batch in iter_batches('processed', READ_COLUMNS, STREAM_BATCH_ROWS, seed=epoch):
+        batch, X, holdout = prepare(batch)
+        features.append(X[~holdout])
+        labels.append(risk_levels(batch, igs_median)[~holdout] >= 1)
+        buffered += len(labels[-1])
+        if buffered >= SHUFFLE_BATCHES * STREAM_BATCH_ROWS:
+            yield from _shuffled(features, labels, rng)
+            features, labels, buffered = [], [], 0
+    if buffered:
+        yield from _shuffled(features, labels, rng)
+
+
+def _shuffled(features, labels, rng):
+    X, y = np.concatenate(features), np.concatenate(labels)
+    order = rng.permutation(len(y))
+    for start in range(0, len(order), STREAM_BATCH_ROWS):
+        rows = order[start:start + STREAM_BATCH_ROWS]
+        yield X[rows], y[rows]
+
+
+def evaluate(model, scaler, igs_median):
+    """Stream the held-out rows once and score them."""
+    labels, scores = [], []
+    for batch in iter_batches('processed', READ_COLUMNS, STREAM_BATCH_ROWS):
+        batch, X, holdout = prepare(batch)
+        if holdout.any():
+            labels.append(risk_levels(batch[holdout], igs_median) >= 1)
+            scores.append(model.predict_proba(scaler.transform(X[holdout]))[:, 1].astype('float32'))
+    if not labels:
+        return {'holdout_rows': 0, 'at_risk_share': np.nan, 'accuracy': np.nan, 'log_loss': np.nan, 'roc_auc': np.nan}
+    y, p = np.concatenate(labels), np.concatenate(scores)
+    return {'holdout_rows': len(y), 'at_risk_share': round(float(y.mean()), 4),
+            'accuracy': round(accuracy_score(y, p >= 0.5), 4), 'log_loss': round(log_loss(y, p, labels=[0, 1]), 4),
+            'roc_auc': round(roc_auc_score(y, p), 4) if 0 < y.mean() < 1 else np.nan}
+
+
+print("=" * 80)
+print("🌊 OUT-OF-CORE PINCODE MODEL (streamed SGD logistic regression)")
+print("=" * 80)
+
+# Pass 0: feature scaling from the training rows, and the IGS median the
+# risk rules compare against
+print(f"\n📊 Scanning processed data in batches of {STREAM_BATCH_ROWS:,} rows...")
+scaler = StandardScaler()
+largest_batch_mb = 0
+# IGS is a ratio of small daily counts, so the tally of its distinct values
+# stays a few thousand entries long however many rows go by
+igs_counts = pd.Series(dtype='int64')
+for batch in iter_batches('processed', READ_COLUMNS, STREAM_BATCH_ROWS):
+    batch, X, holdout = prepare(batch)
+    if (~holdout).any():
+        scaler.partial_fit(X[~holdout])
+    igs_counts = igs_counts.add(batch['IGS'].value_counts(), fill_value=0)
+    largest_batch_mb = max(largest_batch_mb, X.nbytes / 1e6)
+if not hasattr(scaler, 'n_samples_seen_'):
+    raise SystemExit("❌ No processed rows with demographic updates outside the held-out pincodes; nothing to train on")
+igs_median = tally_median(igs_counts)
+print(f"✅ {int(scaler.n_samples_seen_):,} training rows, {len(FEATURE_NAMES)} features, IGS median {igs_median:.4f}")
+print(f"✅ Largest feature batch: {largest_batch_mb:.1f} MB")
+
+params = {'loss': 'log_loss', 'alpha': 1e-3, 'random_state': 42}
+model = SGDClassifier(**params)
+rng = np.random.default_rng(42)
+history = []
+for epoch in range(1, STREAM_EPOCHS + 1):
+    started = time.perf_counter()
+    trained = 0
+    for X, y in training_batches(epoch, igs_median, rng):
+        model.partial_fit(scaler.transform(X), y, classes=[False, True])
+        trained += len(y)
+    fit_seconds = time.perf_counter() - started
+    metrics = {'epoch': epoch, 'train_rows': trained, 'fit_seconds': round(fit_seconds, 2),
+               **evaluate(model, scaler, igs_median)}
+    history.append(metrics)
+    print(f"   Epoch {epoch}: {fit_seconds:.1f}s, held-out accuracy {metrics['accuracy']:.4f}, "
+          f"ROC-AUC {metrics['roc_auc']:.4f}, log loss {metrics['log_loss']:.4f}")
+
+history = pd.DataFrame(history)
+history.to_csv('pincode_stream_metrics.csv', index=False)
+print("\n" + history.to_string(index=False))
+print("✅ Saved: pincode_stream_metrics.csv")
+
+key = artifact_key([], {'params': params, 'epochs': STREAM_EPOCHS, 'batch_rows': STREAM_BATCH_ROWS,
+                        'shuffle_batches': SHUFFLE_BATCHES,
+                        'data': source_fingerprint([dataset_path('processed')])})
+save_artifact('pincode_sgd', key, {'model': model, 'scaler': scaler, 'igs_median': igs_median,
+                                   'features': FEATURE_NAMES}, info={'metrics': history.iloc[-1].to_dict()})
+print(f"💾 Saved model: pincode_sgd {key}")
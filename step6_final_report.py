@@ -1,43 +1,38 @@
 import pandas as pd
 import numpy as np
 
+from rollups import load_rollup
+from schema import decode_dates
+
 print("="*80)
 print("DIGITAL DIVIDE PREDICTOR - FINAL REPORT")
 print("Aadhaar Enrolment & Updates Analysis")
 print("="*80)
 
-# Load all processed data
-data = pd.read_csv('processed_aadhaar_data.csv')
+# Load the district and state×date rollups written by step3
+districts = load_rollup('district')
+state_date = load_rollup('state_date')
 clusters = pd.read_csv('district_clusters.csv')
 
-# Clean data
-state_mapping = {
-    'West bengal': 'West Bengal', 'West Bengli': 'West Bengal',
-    'West Bangal': 'West Bengal', 'West  Bengal': 'West Bengal',
-    'WESTBENGAL': 'West Bengal', 'WEST BENGAL': 'West Bengal',
-    'Uttaranchal': 'Uttarakhand', 'Dadra & Nagar Haveli': 'Dadra and Nagar Haveli',
-    'Andaman & Nicobar Islands': 'Andaman and Nicobar Islands'
-}
-data['state'] = data['state'].replace(state_mapping)
-data = data[~data['state'].isin(['100000', 'Puttenahalli'])]
-
 print("\n" + "="*80)
 print("1. EXECUTIVE SUMMARY")
 print("="*80)
 
-total_records = len(data)
-total_districts = data[['state', 'district']].drop_duplicates().shape[0]
-total_states = data['state'].nunique()
-avg_dli = data['DLI'].mean()
-total_demo = data['total_demo_updates'].sum()
-total_bio = data['total_bio_updates'].sum()
-total_enrol = data['total_enrolments'].sum()
+total_records = int(districts['row_count'].sum())
+total_districts = len(districts)
+total_states = districts['state'].nunique()
+avg_dli = districts['DLI_sum'].sum() / total_records
+# Plain Python ints: the unsigned column sums would wrap on subtraction
+total_demo = int(districts['total_demo_updates'].sum())
+total_bio = int(districts['total_bio_updates'].sum())
+total_enrol = int(districts['total_enrolments'].sum())
 
 print(f"\nDataset Overview:")
 print(f"  • Total Records: {total_records:,}")
 print(f"  • Unique Districts: {total_districts}")
 print(f"  • States/UTs Covered: {total_states}")
-print(f"  • Date Range: {data['date'].min()} to {data['date'].max()}")
+date_range = decode_dates(pd.Series([state_date['date'].min(), state_date['date'].max()]))
+print(f"  • Date Range: {date_range[0]:%d-%m-%Y} to {date_range[1]:%d-%m-%Y}")
 
 print(f"\nKey Metrics:")
 print(f"  • Total Enrolments: {int(total_enrol):,}")
@@ -61,7 +56,7 @@ print(f"  • {len(critical_districts)} districts classified as CRITICAL (DLI <
 print(f"  • These districts need immediate intervention")
 
 print("\n🎯 Finding 3: State-level Disparities")
-state_dli = data.groupby('state')['DLI'].mean().sort_values()
+state_dli = load_rollup('state').set_index('state')['DLI'].sort_values()
 worst_states = state_dli.head(5)
 best_states = state_dli.tail(5)
 print(f"\n  Bottom 5 States (Digital Deserts):")
@@ -148,7 +143,7 @@ print("  • Merged Dataset: 1,081,603 records across 935 districts")
 
 print("\nData Processing:")
 print("  • Merged 3 datasets on (date, state, district, pincode)")
-print("  • Cleaned state name inconsistencies (7 variations)")
+print("  • Canonicalised state/district spellings once at ingest (cached fuzzy matching)")
 print("  • Filled missing values with 0 (no activity = 0 updates)")
 print("  • Calculated Digital Literacy Index (DLI = bio/demo ratio)")
 print("  • Calculated Infrastructure Gap Score (IGS)")
@@ -166,7 +161,7 @@ print("\n" + "="*80)
 print("✅ ANALYSIS COMPLETE")
 print("="*80)
 print("\nGenerated Files:")
-print("  Data: merged_aadhaar_data.csv, processed_aadhaar_data.csv, district_clusters.csv")
+print("  Data: aadhaar_store/merged, aadhaar_store/processed, district_clusters.csv")
 print("  Visualizations: 4 PNG files (viz1-4)")
 print("  ML Outputs: 3 PNG files (model1-2)")
 print("  Total: 10 output files ready for presentation")
@@ -1,12 +1,18 @@
 import pandas as pd
 import os
 
+from data_store import dataset_path, has_dataset, load_frame
+from risk_labels import risk_level_labels
+from rollups import has_rollups, load_rollup
+
 print("Starting data load test...")
 
-if not os.path.exists('processed_aadhaar_data.csv'):
-    print("ERROR: processed_aadhaar_data.csv missing")
+if has_dataset('processed'):
+    print(f"{dataset_path('processed')} exists")
+elif os.path.exists('processed_aadhaar_data.csv'):
+    print("processed_aadhaar_data.csv exists (legacy CSV)")
 else:
-    print("processed_aadhaar_data.csv exists")
+    print("ERROR: processed data missing")
 
 if not os.path.exists('district_predictions_enhanced.csv'):
     print("WARNING: district_predictions_enhanced.csv missing")
@@ -14,12 +20,18 @@ else:
     print("district_predictions_enhanced.csv exists")
 
 try:
-    data = pd.read_csv('processed_aadhaar_data.csv')
+    data = load_frame('processed')
     print(f"Data loaded, shape: {data.shape}")
     print(f"Data columns: {data.columns.tolist()}")
 except Exception as e:
     print(f"Error loading data: {e}")
 
+if has_rollups():
+    rollup = load_rollup('state_date')
+    print(f"State×date rollup loaded, shape: {rollup.shape}")
+else:
+    print("WARNING: rollups missing, run step3_calculate_index.py")
+
 try:
     if os.path.exists('district_predictions_enhanced.csv'):
         clusters = pd.read_csv('district_predictions_enhanced.csv')
@@ -28,11 +40,7 @@ try:
         if 'cluster_label' not in clusters.columns:
             if 'risk_level' in clusters.columns:
                 print("Mapping risk_level to cluster_label")
-                clusters['cluster_label'] = clusters['risk_level'].map({
-                    0: 'Thriving',
-                    1: 'Struggling', 
-                    2: 'Critical'
-                })
+                clusters['cluster_label'] = risk_level_labels(clusters['risk_level']).astype(object)
             else:
                 print("ERROR: neither cluster_label nor risk_level in columns")
     elif os.path.exists('district_clusters.csv'):
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from hierarchy import Hierarchy
+
+
+def index():
+    """Goa/North Goa, Bihar/Patna and Bihar/Gaya; pincode 800001 reported under both Bihar districts."""
+    pairs = pd.DataFrame({
+        'state': ['Goa', 'Bihar', 'Bihar', 'Bihar', 'Bihar'],
+        'district': ['North Goa', 'Patna', 'Patna', 'Gaya', 'Gaya'],
+        'pincode': [403001, 800002, 800001, 800001, 823001],
+        'rows': [4, 2, 1, 3, 5],
+    })
+    return Hierarchy.from_pairs(pairs)
+
+
+def test_districts_are_numbered_by_state():
+    hierarchy = index()
+    assert list(hierarchy.state_names) == ['Bihar', 'Goa']
+    assert list(hierarchy.district_names) == ['Gaya', 'Patna', 'North Goa']
+    assert list(hierarchy.district_state) == [0, 0, 1]
+
+
+def test_lookup_gives_home_district_and_flags_ambiguous_pincodes():
+    hierarchy = index()
+    assert list(hierarchy.lookup([800001, 800002, 403001, 110001])) == [0, 1, 2, -1]
+    assert list(hierarchy.pincodes[hierarchy.ambiguous]) == [800001]
+
+
+def test_rows_roll_up_to_units_districts_and_states():
+    hierarchy = index()
+    ids = hierarchy.unit_ids(hierarchy.district_ids(['Bihar', 'Goa', 'Bihar', 'Bihar'],
+                                                    ['Patna', 'North Goa', 'Gaya', 'Patna']),
+                             [800001, 403001, 800001, 800001])
+    units = hierarchy.unit_totals(ids, np.array([1, 10, 100, 1000]))
+    assert dict(zip(zip(hierarchy.unit_district, hierarchy.unit_pincodes), units)) == {
+        (0, 800001): 100, (0, 823001): 0, (1, 800001): 1001, (1, 800002): 0, (2, 403001): 10}
+    districts = hierarchy.district_totals(units)
+    assert list(districts) == [100, 1001, 10]
+    assert list(hierarchy.state_totals(districts)) == [1101, 10]
+
+
+def test_unknown_units_raise():
+    hierarchy = index()
+    with pytest.raises(KeyError):
+        hierarchy.unit_ids([2], [800001])
@@ -0,0 +1,43 @@
+import pandas as pd
+
+from rollups import SUM_COLUMNS, fold, rollup
+
+PINCODE_KEYS = ['state', 'district', 'pincode']
+
+
+def processed_rows(rows):
+    """Processed-like rows for (state, district, pincode, DLI) tuples, as apply_schema stores them."""
+    frame = pd.DataFrame(rows, columns=PINCODE_KEYS + ['DLI'])
+    frame['state'] = frame['state'].astype('category')
+    frame['district'] = frame['district'].astype('category')
+    frame['pincode'] = frame['pincode'].astype('int32')
+    frame['IGS'] = 0.0
+    for column in ['total_demo_updates', 'total_bio_updates', 'total_enrolments']:
+        frame[column] = 10
+    return frame
+
+
+FIRST = [('Bihar', 'Patna', 800001, 0.5), ('Bihar', 'Patna', 800002, 0.25)]
+SECOND = [('Bihar', 'Patna', 800001, 0.1), ('Goa', 'North Goa', 403001, 0.75)]
+
+
+def by_key(frame):
+    return frame.sort_values(PINCODE_KEYS).reset_index(drop=True)
+
+
+def test_fold_batches_matches_one_rollup():
+    first, second = rollup(processed_rows(FIRST), PINCODE_KEYS), rollup(processed_rows(SECOND), PINCODE_KEYS)
+    folded = fold(first, PINCODE_KEYS, second)
+    expected = rollup(processed_rows(FIRST + SECOND), PINCODE_KEYS)
+    assert str(folded['pincode'].dtype) == 'int32'
+    pd.testing.assert_frame_equal(by_key(folded)[['pincode'] + SUM_COLUMNS],
+                                  by_key(expected)[['pincode'] + SUM_COLUMNS])
+    assert list(by_key(folded)['state'].astype(str)) == list(by_key(expected)['state'].astype(str))
+
+
+def test_fold_removed_drops_emptied_groups():
+    first = rollup(processed_rows(FIRST), PINCODE_KEYS)
+    both = fold(first, PINCODE_KEYS, rollup(processed_rows(SECOND), PINCODE_KEYS))
+    left = fold(both, PINCODE_KEYS, first.iloc[:0], first)
+    assert sorted(left['pincode']) == [403001, 800001]
+    assert left.loc[left['pincode'] == 800001, 'row_count'].item() == 1
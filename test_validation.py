@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from validation import MAX_COUNT, QUARANTINE_ROOT, RULES, quarantine_path, validate_chunk
+
+COUNTS = ['demo_age_5_17', 'demo_age_17_']
+
+
+def raw_chunk(**overrides):
+    """Three valid raw rows as read_csv would give them, with `overrides` per column."""
+    columns = {
+        'date': ['01-03-2025', '02-03-2025', '03-03-2025'],
+        'state': ['Bihar', 'Kerala', 'Goa'],
+        'district': ['Patna', 'Kollam', 'North Goa'],
+        'pincode': [800001, 691001, 403001],
+        'demo_age_5_17': [1, 2, 3],
+        'demo_age_17_': [10, 20, 30],
+    }
+    columns.update(overrides)
+    return pd.DataFrame(columns)
+
+
+def flagged(rule, chunk):
+    return list(RULES[rule](chunk, COUNTS))
+
+
+def test_valid_rows_pass_every_rule():
+    chunk = raw_chunk()
+    for rule in RULES:
+        assert not any(flagged(rule, chunk)), rule
+
+
+def test_missing_key():
+    assert flagged('missing_key', raw_chunk(district=['Patna', None, 'North Goa'])) == [False, True, False]
+
+
+def test_bad_date():
+    assert flagged('bad_date', raw_chunk(date=['01-03-2025', '2025-03-02', '31-02-2025'])) == [False, True, True]
+
+
+def test_bad_pincode_leaves_missing_pincodes_to_missing_key():
+    chunk = raw_chunk(pincode=['80001', 'abcdef', np.nan])
+    assert flagged('bad_pincode', chunk) == [True, True, False]
+    assert flagged('missing_key', chunk) == [False, False, True]
+
+
+def test_invalid_state():
+    assert flagged('invalid_state', raw_chunk(state=['Bihar', '100000', 'Puttenahalli'])) == [False, True, True]
+
+
+def test_bad_count():
+    chunk = raw_chunk(demo_age_5_17=[-1, 2.5, 'many'], demo_age_17_=[10, 20, 30])
+    assert flagged('bad_count', chunk) == [True, True, True]
+    assert flagged('bad_count', raw_chunk(demo_age_17_=[MAX_COUNT + 1, 20, 30])) == [True, False, False]
+
+
+def test_bad_count_accepts_missing_and_large_valid_counts():
+    # Above the uint16 range but plausible: must not depend on the storage dtype
+    chunk = raw_chunk(demo_age_5_17=[np.nan, 70000, 3])
+    assert flagged('bad_count', chunk) == [False, False, False]
+
+
+def test_validate_chunk_splits_rows_and_counts_reasons():
+    chunk = raw_chunk(pincode=['80001', '691001', '403001'], demo_age_5_17=[1, -2, 3])
+    chunk.loc[0, 'date'] = 'soon'
+    clean, rejected, tally = validate_chunk(chunk, COUNTS)
+    assert list(clean['state']) == ['Goa']
+    assert pd.api.types.is_numeric_dtype(clean['pincode'])
+    assert list(rejected['reason']) == ['bad_date;bad_pincode', 'bad_count']
+    assert tally == {'bad_date': 1, 'bad_pincode': 1, 'bad_count': 1, 'rejected': 2}
+
+
+def test_quarantine_path_keeps_subdirectories_apart():
+    first = quarantine_path('biometric', os.path.join('api_data_aadhar_biometric', '2024', 'part_0_100.csv'))
+    second = quarantine_path('biometric', os.path.join('api_data_aadhar_biometric', '2025', 'part_0_100.csv'))
+    assert first != second
+    assert first == os.path.join(QUARANTINE_ROOT, 'biometric', '2024', 'part_0_100.csv')
@@ -0,0 +1,140 @@
+import os
+import shutil
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from canonical_names import INVALID_STATES, name_key
+from data_store import STORE_ROOT
+
+# Row-level checks applied to every raw chunk during ingest. Rejected rows
+# are written to one quarantine CSV per shard, with the codes of every rule
+# they broke, and never reach the merged dataset.
+# Layout: aadhaar_store/quarantine/<source>/<shard path below api_data_aadhar_<source>/>
+QUARANTINE_ROOT = os.path.join(STORE_ROOT, 'quarantine')
+
+KEY_COLUMNS = ['date', 'state', 'district', 'pincode']
+
+# A single raw row (one pincode, one day) reporting more than this is a
+# data error. This is a plausibility bound, not a storage limit: per-key
+# sums of valid rows can go well past it and are stored as uint32.
+MAX_COUNT = 1_000_000
+
+
+def _per_value(series, check):
+    """Evaluate `check` once per distinct value of `series` and broadcast it back."""
+    codes, uniques = pd.factorize(series)
+    verdicts = np.array([check(value) for value in uniques], dtype=bool)
+    return np.where(codes >= 0, verdicts[codes], False)
+
+
+def _bad_date(value):
+    return pd.isna(pd.to_datetime(value, format='%d-%m-%Y', errors='coerce'))
+
+
+def _invalid_state(value):
+    key = name_key(value)
+    return not key or key.isdigit() or key in INVALID_STATES
+
+
+def missing_key(chunk, counts):
+    return chunk[KEY_COLUMNS].isna().any(axis=1).to_numpy()
+
+
+def bad_date(chunk, counts):
+    return _per_value(chunk['date'], _bad_date)
+
+
+def bad_pincode(chunk, counts):
+    pincode = pd.to_numeric(chunk['pincode'], errors='coerce')
+    valid = pincode.between(100000, 999999) & (pincode % 1 == 0)
+    return (~valid & chunk['pincode'].notna()).to_numpy()
+
+
+def invalid_state(chunk, counts):
+    return _per_value(chunk['state'], _invalid_state)
+
+
+def bad_count(chunk, counts):
+    bad = np.zeros(len(chunk), dtype=bool)
+    for column in counts:
+        values = pd.to_numeric(chunk[column], errors='coerce')
+        unparsed = values.isna() & chunk[column].notna()
+        bad |= (unparsed | (values < 0) | (values > MAX_COUNT) | (values.notna() & (values % 1 != 0))).to_numpy()
+    return bad
+
+
+# Rule name -> vectorised check returning a boolean "row is bad" mask
+RULES = {
+    'missing_key': missing_key,
+    'bad_date': bad_date,
+    'bad_pincode': bad_pincode,
+    'invalid_state': invalid_state,
+    'bad_count': bad_count,
+}
+
+
+def validate_chunk(chunk, counts):
+    """Split a raw chunk into (clean rows, rejected rows with a 'reason' column, Counter).
+
+    The counter has the number of rows failing each rule plus 'rejected',
+    the number of distinct rows dropped.
+    """
+    reason = np.full(len(chunk), '', dtype=object)
+    tally = Counter()
+    for name, check in RULES.items():
+        failed = check(chunk, counts)
+        if failed.any():
+            tally[name] += int(failed.sum())
+            reason[failed] = reason[failed] + (name + ';')
+    rejected = reason != ''
+    tally['rejected'] += int(rejected.sum())
+    clean = chunk.loc[~rejected].copy()
+    # Columns that held junk were read as text; the survivors are all numeric
+    for column in ['pincode'] + counts:
+        if not pd.api.types.is_numeric_dtype(clean[column]):
+            clean[column] = pd.to_numeric(clean[column])
+    bad = chunk.loc[rejected].assign(reason=[code.rstrip(';') for code in reason[rejected]])
+    return clean, bad, tally
+
+
+def quarantine_path(source, shard_path):
+    """Quarantine CSV of a shard, at the shard's path relative to its source directory.
+
+    Shards with the same file name in different subdirectories get
+    different files.
+    """
+    parts = os.path.normpath(shard_path).split(os.sep)
+    anchor = f'api_data_aadhar_{source}'
+    relative = parts[parts.index(anchor) + 1:] if anchor in parts[:-1] else parts[-1:]
+    return os.path.join(QUARANTINE_ROOT, source, *relative)
+
+
+class Quarantine:
+    """Streams one shard's rejected rows to its quarantine CSV, chunk by chunk."""
+
+    def __init__(self, source, shard_path):
+        self.path = quarantine_path(source, shard_path)
+        self.counts = Counter()
+        self.started = False
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def add(self, rejected, tally):
+        self.counts.update(tally)
+        if len(rejected):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            rejected.to_csv(self.path, mode='a' if self.started else 'w', header=not self.started, index=False)
+            self.started = True
+
+
+def drop_quarantine(source, shard_path):
+    path = quarantine_path(source, shard_path)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def reset_quarantine():
+    if os.path.isdir(QUARANTINE_ROOT):
+        shutil.rmtree(QUARANTINE_ROOT)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from schema import apply_schema, decode_dates
+
+# Trailing-window DLI/IGS for every group of a dated rollup (district×date
+# or state×date). Each window value is the row-level mean over the last
+# `w` calendar days: DLI_sum / row_count summed over the window.
+WINDOWS = (7, 30, 90)
+WINDOW_SUMS = ['DLI_sum', 'IGS_sum', 'row_count']
+
+
+def rolling_indices(frame, keys, windows=WINDOWS):
+    """Rolling DLI/IGS for every group and calendar day of a dated rollup.
+
+    The rollup is scattered into a dense group×day array, cumulated once
+    along the day axis, and each window is the difference of two shifted
+    cumulative sums, so all groups and windows come out of a handful of
+    array operations. Days where a group has no rows in its longest window
+    are left out.
+    """
+    if frame.empty:
+        empty = {f'{index}_{window}d': pd.Series(dtype='float32') for window in windows for index in ('DLI', 'IGS')}
+        return apply_schema(pd.DataFrame({**{key: frame[key].iloc[:0] for key in keys},
+                                          'date': pd.Series(dtype='int32'), **empty}))
+    group_ids, groups = pd.MultiIndex.from_frame(frame[keys]).factorize()
+    days = decode_dates(frame['date']).to_numpy().astype('datetime64[D]')
+    first_day = days.min()
+    day_ids = (days - first_day).astype('int64')
+    day_count = int(day_ids.max()) + 1
+
+    # Leading zero column so a window starting on day 0 subtracts nothing
+    sums = np.zeros((len(WINDOW_SUMS), len(groups), day_count + 1))
+    # add.at rather than assignment: a coarser key (e.g. one country over
+    # state rows) puts several rows on the same group and day
+    for i, column in enumerate(WINDOW_SUMS):
+        np.add.at(sums[i], (group_ids, day_ids + 1), frame[column].to_numpy(dtype='float64'))
+    cumulative = sums.cumsum(axis=2)
+    ends = np.arange(1, day_count + 1)
+
+    columns = {}
+    for window in windows:
+        starts = np.maximum(ends - window, 0)
+        dli_sum, igs_sum, rows = cumulative[:, :, ends] - cumulative[:, :, starts]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            columns[f'DLI_{window}d'] = np.where(rows > 0, dli_sum / rows, np.nan).astype('float32')
+            columns[f'IGS_{window}d'] = np.where(rows > 0, igs_sum / rows, np.nan).astype('float32')
+
+    calendar = pd.DatetimeIndex(first_day + np.arange(day_count))
+    result = pd.DataFrame({column: values.ravel() for column, values in columns.items()})
+    result['date'] = np.tile((calendar.year * 10000 + calendar.month * 100 + calendar.day).to_numpy('int32'),
+                             len(groups))
+    for level, key in enumerate(keys):
+        result[key] = np.repeat(groups.get_level_values(level), day_count)
+    result = result[keys + ['date'] + list(columns)]
+    return apply_schema(result[result[f'DLI_{max(windows)}d'].notna()].reset_index(drop=True))